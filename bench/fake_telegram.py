@@ -0,0 +1,139 @@
+"""
+Локальная имитация Bot API для нагрузочных прогонов.
+
+Понимает методы, которыми пользуется бот (getUpdates, sendMessage, copyMessage,
+answerCallbackQuery, setMyCommands и служебные), добавляет задержку ответа и
+с заданной вероятностью отвечает 429 (Too Many Requests).
+Апдейты подаются через inject(), задержка считается от inject() до ответа бота в тот же чат.
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+
+class FakeTelegram:
+    def __init__(self, latency: float = 0.02, jitter: float = 0.01,
+                 rate_limit_probability: float = 0.0, retry_after: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+
+        self._updates: Deque[Dict[str, Any]] = deque()
+        self._new_updates = asyncio.Event()
+        self._update_id = 0
+        self._message_id = 0
+
+        # Ожидающие ответа апдейты: чат → времена подачи; callback_query_id → время подачи
+        self._waiting_chats: Dict[int, Deque[float]] = defaultdict(deque)
+        self._waiting_callbacks: Dict[str, float] = {}
+
+        self.latencies: List[float] = []
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.rate_limited = 0
+        self.injected = 0
+        self.first_inject: Optional[float] = None
+        self.last_reply: Optional[float] = None
+
+    # ---- подача апдейтов ----
+
+    def inject(self, payload_type: str, payload: Dict[str, Any], expects_reply: bool = True):
+        self._update_id += 1
+        now = time.perf_counter()
+        self.first_inject = self.first_inject or now
+        self.injected += 1
+        if expects_reply:
+            if payload_type == "callback_query":
+                self._waiting_callbacks[payload["id"]] = now
+            else:
+                self._waiting_chats[payload["chat"]["id"]].append(now)
+        self._updates.append({"update_id": self._update_id, payload_type: payload})
+        self._new_updates.set()
+
+    def pending_replies(self) -> int:
+        return sum(len(q) for q in self._waiting_chats.values()) + len(self._waiting_callbacks)
+
+    def _reply(self, started: Optional[float]):
+        if started is not None:
+            now = time.perf_counter()
+            self.latencies.append(now - started)
+            self.last_reply = now
+
+    # ---- HTTP ----
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        self.calls[method] += 1
+        data = dict(await request.post())
+
+        if method == "getupdates":
+            return web.json_response({"ok": True, "result": await self._get_updates(data)})
+
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+        if method in ("sendmessage", "copymessage", "answercallbackquery") \
+                and random.random() < self.rate_limit_probability:
+            self.rate_limited += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+
+        if method in ("sendmessage", "copymessage"):
+            chat_id = int(data.get("chat_id", 0))
+            waiting = self._waiting_chats.get(chat_id)
+            self._reply(waiting.popleft() if waiting else None)
+            self._message_id += 1
+            result: Any = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+                "from": BOT_USER,
+                "text": data.get("text", ""),
+            }
+            if method == "copymessage":
+                result = {"message_id": self._message_id}
+        elif method == "answercallbackquery":
+            self._reply(self._waiting_callbacks.pop(data.get("callback_query_id"), None))
+            result = True
+        elif method == "getme":
+            result = BOT_USER
+        elif method == "getwebhookinfo":
+            result = {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, data: Dict[str, str]) -> List[Dict[str, Any]]:
+        offset = int(data.get("offset") or 0)
+        limit = int(data.get("limit") or 100)
+        timeout = float(data.get("timeout") or 0)
+
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(self._updates)[:limit]
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> web.AppRunner:
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
@@ -0,0 +1,151 @@
+"""
+Нагрузочный прогон бота против локальной имитации Bot API (bench/fake_telegram.py).
+
+Гоняет настоящий Dispatcher из main.py через long polling: синтетические апдейты
+от множества пользователей (/start, нажатия кнопок, админ-команды), ответы с задержкой
+и 429. В конце печатает пропускную способность и p50/p90/p99 задержки.
+
+    python -m bench.load --users 1000 --updates 20000 --rate 500
+    python -m bench.load --light        # без Postgres/Redis: только хендлеры и MemoryStorage
+
+Без --light нужны PostgreSQL и Redis из .env — как при обычном запуске.
+В --light админ-команды (/id) не подаются: без пула они уходят в ошибку и не отвечают,
+и прогон мерил бы путь ошибки, а не обработку.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.bot.api import TelegramAPIServer
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+
+import main
+from bench.fake_telegram import FakeTelegram
+from bot.configs.bot import dp, bot
+from bot.handlers.all import register_all_handlers
+from bot.middlewares import metrics
+
+BASE_USER_ID = 7_000_000_000
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}", "language_code": "en"}
+
+
+def _command(user_id: int, text: str) -> dict:
+    return {
+        "message_id": random.randint(1, 10 ** 9),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        "text": text,
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+    }
+
+
+def _callback(user_id: int, data: str) -> dict:
+    return {
+        "id": str(random.getrandbits(63)),
+        "from": _user(user_id),
+        "chat_instance": str(user_id),
+        "data": data,
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "text": "menu",
+        },
+    }
+
+
+async def generate(fake: FakeTelegram, args):
+    """Подаём апдейты с заданной частотой: смесь /start, колбэков и админ-команд."""
+    interval = 1.0 / args.rate if args.rate else 0
+    admin_share = 0.0 if args.light else args.admin_share
+    started = time.perf_counter()
+    for i in range(args.updates):
+        user_id = BASE_USER_ID + random.randrange(args.users)
+        roll = random.random()
+        if roll < args.callback_share:
+            # На колбэки без хендлера бот не отвечает — их ответ не ждём
+            fake.inject("callback_query", _callback(user_id, "bench"), expects_reply=False)
+        elif roll < args.callback_share + admin_share:
+            fake.inject("message", _command(user_id, "/id"))
+        else:
+            fake.inject("message", _command(user_id, "/start"))
+        if interval:
+            delay = started + (i + 1) * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+async def run(args):
+    fake = FakeTelegram(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        rate_limit_probability=args.rate_limit,
+    )
+    runner = await fake.start(port=args.port)
+    bot.server = TelegramAPIServer.from_base(f"http://127.0.0.1:{args.port}")
+    Bot.set_current(bot)
+    Dispatcher.set_current(dp)
+
+    if args.light:
+        if args.admin_share:
+            print("--light: без админ-команд (им нужна БД), --admin-share не учитывается")
+        dp.storage = MemoryStorage()
+        register_all_handlers(dp)
+        # Троттлинг ходит в Redis — в лёгком режиме только метрики
+        metrics.setup(dp)
+    else:
+        await main.on_startup(dp)
+
+    polling = asyncio.create_task(dp.start_polling(timeout=1))
+    try:
+        await generate(fake, args)
+        deadline = time.perf_counter() + args.drain
+        while fake.pending_replies() and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+    finally:
+        dp.stop_polling()
+        await asyncio.gather(polling, return_exceptions=True)
+        if not args.light:
+            await main.on_shutdown(dp)
+        session = await bot.get_session()
+        await session.close()
+        await runner.cleanup()
+
+    lat = [x * 1000 for x in fake.latencies]
+    elapsed = (fake.last_reply or time.perf_counter()) - (fake.first_inject or 0)
+    print(f"updates injected : {fake.injected}")
+    print(f"replies          : {len(lat)} (unanswered: {fake.pending_replies()})")
+    print(f"429 responses    : {fake.rate_limited}")
+    print(f"throughput       : {len(lat) / elapsed:.1f} replies/s" if elapsed > 0 else "throughput       : —")
+    print(f"latency p50/p90/p99/max: {percentile(lat, 50):.1f} / {percentile(lat, 90):.1f} / "
+          f"{percentile(lat, 99):.1f} / {max(lat, default=0):.1f} ms")
+    print("api calls        : " + ", ".join(f"{k}={v}" for k, v in sorted(fake.calls.items())))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=200, help="апдейтов в секунду (0 — без ограничения)")
+    parser.add_argument("--callback-share", type=float, default=0.2)
+    parser.add_argument("--admin-share", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=20, help="задержка Bot API, мс")
+    parser.add_argument("--jitter", type=float, default=5, help="разброс задержки, мс")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="вероятность ответа 429")
+    parser.add_argument("--drain", type=float, default=30, help="сколько ждать хвост ответов, с")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--light", action="store_true", help="без Postgres/Redis")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""
+Микро-бенчмарк слоя доступа к данным против локального PostgreSQL.
+
+Сравнивает прежнюю схему (ручной acquire/release, сырой SQL, SELECT *, dict)
+с подготовленными именованными запросами из bot/databases/postgres.py.
+
+    python -m bench.postgres_queries --users 1000 --iterations 20000 --concurrency 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import asyncpg
+
+from bot.configs import db_pool
+from bot.configs.databases import postgresql
+from bot.databases.init import init_db
+from bot.databases.postgres import User
+
+BENCH_USER_BASE = 9_000_000_000_000
+
+
+async def legacy_select(user_id):
+    conn: asyncpg.Connection = await db_pool.pool.acquire()
+    try:
+        row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", user_id)
+        return dict(row) if row else None
+    finally:
+        await db_pool.pool.release(conn)
+
+
+async def legacy_select_id(user_id):
+    conn: asyncpg.Connection = await db_pool.pool.acquire()
+    try:
+        row = await conn.fetchrow("SELECT id FROM users WHERE user_id = $1", user_id)
+        return row["id"] if row else None
+    finally:
+        await db_pool.pool.release(conn)
+
+
+async def run(name, func, user_ids, iterations, concurrency):
+    queue = iter(range(iterations))
+
+    async def worker():
+        for _ in queue:
+            await func(random.choice(user_ids))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    print(f"{name:<22} {iterations / elapsed:>10.0f} ops/s   {elapsed / iterations * 1e6:>8.1f} µs/op")
+
+
+async def main(args):
+    await db_pool.create_pool(
+        user=postgresql.user,
+        password=postgresql.password,
+        database=postgresql.db_name,
+        host=postgresql.host,
+        port=postgresql.port
+    )
+    await init_db()
+
+    user_ids = [BENCH_USER_BASE + i for i in range(args.users)]
+    for user_id in user_ids:
+        await User.upsert(user_id, "bench", "Bench", None, "en", False)
+
+    try:
+        for _ in range(2):  # первый проход — прогрев
+            await run("legacy select", legacy_select, user_ids, args.iterations, args.concurrency)
+            await run("prepared select", User.select, user_ids, args.iterations, args.concurrency)
+            await run("legacy select_id", legacy_select_id, user_ids, args.iterations, args.concurrency)
+            await run("prepared select_id", User.select_id, user_ids, args.iterations, args.concurrency)
+            print()
+    finally:
+        async with db_pool.pool.acquire() as conn:
+            await conn.execute("DELETE FROM users WHERE user_id >= $1", BENCH_USER_BASE)
+        await db_pool.pool.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -1,9 +1,17 @@
 from dotenv import load_dotenv
 import os
 import asyncpg
-import redis as redis_lib
+import redis.asyncio as aioredis
 load_dotenv()
 
+def _env_int(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+def _env_float(name, default=None):
+    value = os.getenv(name)
+    return float(value) if value not in (None, '') else default
+
 class Postgresql:
     def __init__(self):
         self.db_name = os.getenv('POSTGRES_DB')
@@ -12,6 +20,23 @@ class Postgresql:
         self.host = os.getenv('POSTGRES_HOST')
         self.port = os.getenv('POSTGRES_PORT')
 
+        # Пул соединений
+        self.pool_min_size = _env_int('POSTGRES_POOL_MIN_SIZE', 10)
+        self.pool_max_size = _env_int('POSTGRES_POOL_MAX_SIZE', 10)
+        self.pool_max_inactive_lifetime = _env_float('POSTGRES_POOL_MAX_INACTIVE_LIFETIME', 300.0)
+        self.pool_acquire_timeout = _env_float('POSTGRES_POOL_ACQUIRE_TIMEOUT')
+        self.statement_cache_size = _env_int('POSTGRES_STATEMENT_CACHE_SIZE', 100)
+        self.command_timeout = _env_float('POSTGRES_COMMAND_TIMEOUT')
+        self.connect_timeout = _env_float('POSTGRES_CONNECT_TIMEOUT', 60.0)
+        self.slow_query_threshold = _env_float('POSTGRES_SLOW_QUERY_MS', 500.0) / 1000
+
+        # Реплики для чтения: "host" или "host:port" через запятую (пусто — всё читается с primary)
+        self.replica_hosts = [h.strip() for h in os.getenv('POSTGRES_REPLICA_HOSTS', '').split(',') if h.strip()]
+        self.replica_pool_min_size = _env_int('POSTGRES_REPLICA_POOL_MIN_SIZE', 2)
+        self.replica_pool_max_size = _env_int('POSTGRES_REPLICA_POOL_MAX_SIZE', 10)
+        self.replica_max_lag = _env_float('POSTGRES_REPLICA_MAX_LAG', 5.0)
+        self.replica_health_interval = _env_float('POSTGRES_REPLICA_HEALTH_INTERVAL', 5.0)
+
     def __getattr__(self, item):
         return getattr(self, item, None)
 
@@ -24,6 +49,11 @@ class Redis:
         self.db = os.getenv('REDIS_DB')
         self.password = os.getenv('REDIS_PASSWORD')
 
+        # Пул соединений (общий для хелперов и FSM-хранилища)
+        self.max_connections = _env_int('REDIS_MAX_CONNECTIONS', 50)
+        self.pool_timeout = _env_float('REDIS_POOL_TIMEOUT', 5.0)
+        self.socket_timeout = _env_float('REDIS_SOCKET_TIMEOUT', 5.0)
+
     def __getattr__(self, item):
         return getattr(self, item, None)
 
@@ -39,10 +69,27 @@ class LangRedis:
 
 redis = Redis()
 
-# Підключення до Redis
-r = redis_lib.Redis(
+# Підключення до Redis (asyncio, обмежений пул)
+redis_pool = aioredis.BlockingConnectionPool(
     host=redis.host,
-    port=redis.port,
-    db=redis.db,
+    port=int(redis.port) if redis.port else 6379,
+    db=int(redis.db) if redis.db else 0,
+    password=redis.password or None,
+    max_connections=redis.max_connections,
+    timeout=redis.pool_timeout,
+    socket_timeout=redis.socket_timeout,
     decode_responses=True
 )
+r = aioredis.Redis(connection_pool=redis_pool)
+
+# Бинарный клиент (без decode_responses) — для компактных msgpack-значений FSM
+redis_binary_pool = aioredis.BlockingConnectionPool(
+    host=redis.host,
+    port=int(redis.port) if redis.port else 6379,
+    db=int(redis.db) if redis.db else 0,
+    password=redis.password or None,
+    max_connections=redis.max_connections,
+    timeout=redis.pool_timeout,
+    socket_timeout=redis.socket_timeout
+)
+r_binary = aioredis.Redis(connection_pool=redis_binary_pool)
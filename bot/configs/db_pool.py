@@ -1,13 +1,364 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
 import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+from loguru import logger
 
 pool: asyncpg.Pool = None
+acquire_timeout: Optional[float] = None
+# Параметры primary-пула — реплики создаются с теми же настройками соединений
+_pool_kwargs: Dict[str, Any] = {}
+
+# Именованные запросы: name -> SQL. Заполняется модулями доступа к данным при импорте.
+statements: Dict[str, str] = {}
+
+
+def register_statement(name: str, query: str) -> str:
+    statements[name] = query
+    return name
+
+
+class PoolMetrics:
+    """Счётчики пула: ожидание acquire (гистограмма), QPS, ошибки и медленные запросы."""
+
+    # Верхние границы корзин ожидания acquire, секунды
+    ACQUIRE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+    QPS_WINDOW = 60
+
+    def __init__(self, slow_query_threshold: float = 0.5):
+        self.slow_query_threshold = slow_query_threshold
+        self.acquire_buckets = [0] * (len(self.ACQUIRE_BUCKETS) + 1)
+        self.acquire_count = 0
+        self.acquire_sum = 0.0
+        self.acquire_max = 0.0
+        self.queries_total = 0
+        self.query_errors = 0
+        self.slow_queries = 0
+        self.query_time_sum = 0.0
+        self.replica_queries = 0
+        self.replica_fallbacks = 0
+        # Кольцо посекундных счётчиков запросов за последние QPS_WINDOW секунд
+        self._per_second = [0] * self.QPS_WINDOW
+        self._last_second = int(time.monotonic())
+
+    def observe_acquire(self, elapsed: float):
+        i = 0
+        while i < len(self.ACQUIRE_BUCKETS) and elapsed > self.ACQUIRE_BUCKETS[i]:
+            i += 1
+        self.acquire_buckets[i] += 1
+        self.acquire_count += 1
+        self.acquire_sum += elapsed
+        self.acquire_max = max(self.acquire_max, elapsed)
+
+    def observe_query(self, name: str, elapsed: float, error: bool = False):
+        self._advance()
+        self._per_second[self._last_second % self.QPS_WINDOW] += 1
+        self.queries_total += 1
+        self.query_time_sum += elapsed
+        if error:
+            self.query_errors += 1
+        if elapsed >= self.slow_query_threshold:
+            self.slow_queries += 1
+            logger.warning(f"🐢 Медленный запрос {name}: {elapsed * 1000:.1f} мс")
+
+    def qps(self, window: int = 10) -> float:
+        self._advance()
+        window = min(window, self.QPS_WINDOW - 1)
+        now = self._last_second
+        # Текущая секунда ещё не закончилась — считаем по завершённым
+        total = sum(self._per_second[(now - i) % self.QPS_WINDOW] for i in range(1, window + 1))
+        return total / window
+
+    def _advance(self):
+        now = int(time.monotonic())
+        if now == self._last_second:
+            return
+        for s in range(self._last_second + 1, min(now, self._last_second + self.QPS_WINDOW) + 1):
+            self._per_second[s % self.QPS_WINDOW] = 0
+        self._last_second = now
+
+    def snapshot(self) -> Dict[str, Any]:
+        size = pool.get_size() if pool else 0
+        idle = pool.get_idle_size() if pool else 0
+        return {
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "min_size": pool.get_min_size() if pool else 0,
+            "max_size": pool.get_max_size() if pool else 0,
+            "acquire_count": self.acquire_count,
+            "acquire_avg": self.acquire_sum / self.acquire_count if self.acquire_count else 0.0,
+            "acquire_max": self.acquire_max,
+            "acquire_buckets": list(zip(self.ACQUIRE_BUCKETS + (float("inf"),), self.acquire_buckets)),
+            "queries_total": self.queries_total,
+            "query_errors": self.query_errors,
+            "slow_queries": self.slow_queries,
+            "slow_query_threshold": self.slow_query_threshold,
+            "qps_10s": self.qps(10),
+            "qps_1m": self.qps(self.QPS_WINDOW - 1),
+            "replicas": len(replicas),
+            "replicas_healthy": sum(1 for rep in replicas if rep.healthy),
+            "replica_queries": self.replica_queries,
+            "replica_fallbacks": self.replica_fallbacks,
+        }
+
+    def render_prometheus(self) -> str:
+        """Текстовый формат Prometheus."""
+        snap = self.snapshot()
+        lines = [
+            "# TYPE bot_db_pool_connections gauge",
+            f'bot_db_pool_connections{{state="in_use"}} {snap["in_use"]}',
+            f'bot_db_pool_connections{{state="idle"}} {snap["idle"]}',
+            f"bot_db_pool_max_size {snap['max_size']}",
+            "# TYPE bot_db_pool_acquire_seconds histogram",
+        ]
+        cumulative = 0
+        for le, count in snap["acquire_buckets"]:
+            cumulative += count
+            le_str = "+Inf" if le == float("inf") else repr(le)
+            lines.append(f'bot_db_pool_acquire_seconds_bucket{{le="{le_str}"}} {cumulative}')
+        lines += [
+            f"bot_db_pool_acquire_seconds_sum {self.acquire_sum}",
+            f"bot_db_pool_acquire_seconds_count {self.acquire_count}",
+            "# TYPE bot_db_queries_total counter",
+            f"bot_db_queries_total {self.queries_total}",
+            "# TYPE bot_db_query_errors_total counter",
+            f"bot_db_query_errors_total {self.query_errors}",
+            "# TYPE bot_db_slow_queries_total counter",
+            f"bot_db_slow_queries_total {self.slow_queries}",
+            "# TYPE bot_db_query_seconds_sum counter",
+            f"bot_db_query_seconds_sum {self.query_time_sum}",
+            "# TYPE bot_db_replicas gauge",
+            f'bot_db_replicas{{state="healthy"}} {snap["replicas_healthy"]}',
+            f'bot_db_replicas{{state="unhealthy"}} {snap["replicas"] - snap["replicas_healthy"]}',
+            "# TYPE bot_db_replica_queries_total counter",
+            f"bot_db_replica_queries_total {self.replica_queries}",
+            "# TYPE bot_db_replica_fallbacks_total counter",
+            f"bot_db_replica_fallbacks_total {self.replica_fallbacks}",
+        ]
+        return "\n".join(lines) + "\n"
+
 
-async def create_pool(user, password, database, host, port):
-    global pool
-    pool = await asyncpg.create_pool(
+metrics = PoolMetrics()
+
+
+class PreparedConnection(asyncpg.Connection):
+    """Соединение, которое держит подготовленные именованные запросы."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: Dict[str, PreparedStatement] = {}
+
+
+async def _prepare(conn: PreparedConnection, name: str) -> PreparedStatement:
+    stmt = conn.prepared.get(name)
+    if stmt is None:
+        stmt = conn.prepared[name] = await conn.prepare(statements[name])
+    return stmt
+
+
+async def _init_connection(conn: PreparedConnection):
+    for name in statements:
+        try:
+            await _prepare(conn, name)
+        except asyncpg.PostgresError:
+            # Схема ещё не догнала запросы (первый запуск или база до миграций):
+            # подготовим при первом вызове, после migrate() соединения пересоздаются
+            continue
+
+
+async def create_pool(user, password, database, host, port,
+                      min_size: int = 10,
+                      max_size: int = 10,
+                      max_inactive_connection_lifetime: float = 300.0,
+                      statement_cache_size: int = 100,
+                      command_timeout: Optional[float] = None,
+                      connect_timeout: float = 60.0,
+                      pool_acquire_timeout: Optional[float] = None,
+                      slow_query_threshold: float = 0.5):
+    global pool, acquire_timeout, _pool_kwargs
+    acquire_timeout = pool_acquire_timeout
+    metrics.slow_query_threshold = slow_query_threshold
+    _pool_kwargs = dict(
         user=user,
         password=password,
         database=database,
-        host=host,
-        port=int(port)
-    )
\ No newline at end of file
+        max_inactive_connection_lifetime=max_inactive_connection_lifetime,
+        statement_cache_size=statement_cache_size,
+        command_timeout=command_timeout,
+        timeout=connect_timeout,
+        connection_class=PreparedConnection,
+        init=_init_connection
+    )
+    pool = await asyncpg.create_pool(host=host, port=int(port), min_size=min_size, max_size=max_size, **_pool_kwargs)
+
+
+class Replica:
+    """Пул одной реплики для чтения и результат её последней проверки."""
+    __slots__ = ("host", "port", "pool", "healthy", "lag")
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.pool: Optional[asyncpg.Pool] = None
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"Replica({self.host}:{self.port}, healthy={self.healthy}, lag={self.lag})"
+
+
+replicas: List[Replica] = []
+_replica_rr = itertools.count()
+_replica_sizes: Dict[str, int] = {}
+_check_timeout: float = 5.0
+_health_task: Optional[asyncio.Task] = None
+
+# Отставание реплики в секундах; если всё полученное уже применено — 0, даже когда primary простаивает
+_LAG_QUERY = """
+    SELECT pg_is_in_recovery(),
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END
+"""
+
+# Ошибки, после которых чтение повторяется на primary, а реплика считается недоступной
+_REPLICA_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError,
+                   asyncpg.InterfaceError, asyncpg.CannotConnectNowError)
+
+
+async def start_replicas(hosts: List[str], default_port, min_size: int = 2, max_size: int = 10,
+                         max_lag: float = 5.0, health_interval: float = 5.0):
+    """
+    Поднять пулы реплик (hosts — "host" или "host:port") и фоновую проверку их состояния.
+    Вызывать после create_pool. Недоступная при старте реплика не мешает запуску —
+    проверка будет пытаться подключиться к ней снова.
+    """
+    global _health_task, _check_timeout
+    _replica_sizes.update(min_size=min_size, max_size=max_size)
+    _check_timeout = max(health_interval, 1.0)
+    for item in hosts:
+        host, _, port = item.partition(":")
+        replicas.append(Replica(host, int(port or default_port)))
+    if not replicas:
+        return
+    await _check_replicas(max_lag)
+    _health_task = asyncio.create_task(_health_loop(max_lag, health_interval))
+
+
+async def stop_replicas():
+    global _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        await asyncio.gather(_health_task, return_exceptions=True)
+        _health_task = None
+    for rep in replicas:
+        if rep.pool is not None:
+            await rep.pool.close()
+    replicas.clear()
+
+
+async def _check_replica(rep: Replica, max_lag: float):
+    try:
+        if rep.pool is None:
+            rep.pool = await asyncio.wait_for(
+                asyncpg.create_pool(host=rep.host, port=rep.port, **_replica_sizes, **_pool_kwargs),
+                timeout=_check_timeout
+            )
+        in_recovery, lag = await rep.pool.fetchrow(_LAG_QUERY, timeout=_check_timeout)
+    except Exception as e:
+        if rep.healthy:
+            logger.warning(f"Реплика {rep.host}:{rep.port} недоступна: {e!r}")
+        rep.healthy = False
+        rep.lag = None
+        return
+    rep.lag = float(lag)
+    healthy = bool(in_recovery) and rep.lag <= max_lag
+    if healthy != rep.healthy:
+        state = "в строю" if healthy else f"выведена (recovery={in_recovery}, отставание {rep.lag:.1f} с)"
+        logger.info(f"Реплика {rep.host}:{rep.port} {state}")
+    rep.healthy = healthy
+
+
+async def _check_replicas(max_lag: float):
+    await asyncio.gather(*(_check_replica(rep, max_lag) for rep in replicas))
+
+
+async def _health_loop(max_lag: float, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await _check_replicas(max_lag)
+
+
+def _pick_replica() -> Optional[Replica]:
+    """Следующая здоровая реплика по кругу; None — читать с primary."""
+    healthy = [rep for rep in replicas if rep.healthy]
+    if not healthy:
+        return None
+    return healthy[next(_replica_rr) % len(healthy)]
+
+
+@asynccontextmanager
+async def connection(target: Optional[asyncpg.Pool] = None):
+    """acquire с учётом времени ожидания в метриках. target — пул реплики, по умолчанию primary."""
+    started = time.perf_counter()
+    async with (target if target is not None else pool).acquire(timeout=acquire_timeout) as conn:
+        metrics.observe_acquire(time.perf_counter() - started)
+        yield conn
+
+
+async def _run(name: str, action: Callable[[PreparedStatement], Any], replica: bool = False) -> Any:
+    rep = _pick_replica() if replica else None
+    if rep is not None:
+        try:
+            result = await _execute(name, action, rep.pool)
+        except _REPLICA_ERRORS as e:
+            # Чтение безопасно повторить: реплику выводим до следующей проверки и идём на primary
+            logger.warning(f"Реплика {rep.host}:{rep.port} не ответила на {name}: {e!r}")
+            rep.healthy = False
+            metrics.replica_fallbacks += 1
+        else:
+            metrics.replica_queries += 1
+            return result
+    return await _execute(name, action)
+
+
+async def _execute(name: str, action: Callable[[PreparedStatement], Any],
+                   target: Optional[asyncpg.Pool] = None) -> Any:
+    async with connection(target) as conn:
+        stmt = await _prepare(conn, name)
+        started = time.perf_counter()
+        error = False
+        try:
+            return await action(stmt)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.observe_query(name, time.perf_counter() - started, error)
+
+
+# replica=True — запрос только читает и может выполниться на реплике (с откатом на primary)
+
+async def fetchrow(name: str, *args, replica: bool = False) -> Optional[asyncpg.Record]:
+    return await _run(name, lambda stmt: stmt.fetchrow(*args), replica)
+
+
+async def fetchval(name: str, *args, replica: bool = False) -> Any:
+    return await _run(name, lambda stmt: stmt.fetchval(*args), replica)
+
+
+async def fetch(name: str, *args, replica: bool = False) -> List[asyncpg.Record]:
+    return await _run(name, lambda stmt: stmt.fetch(*args), replica)
+
+
+async def execute(name: str, *args) -> str:
+    """Выполнить запрос без результата, вернуть статус (например, 'UPDATE 3')."""
+    async def action(stmt: PreparedStatement) -> str:
+        await stmt.fetch(*args)
+        return stmt.get_statusmsg()
+    return await _run(name, action)
@@ -0,0 +1,14 @@
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+class MetricsConfig:
+    def __init__(self):
+        self.host = os.getenv('METRICS_HOST', '127.0.0.1')
+        # 0 — не поднимать HTTP-эндпоинт
+        self.port = int(os.getenv('METRICS_PORT', 0) or 0)
+
+    def __getattr__(self, item):
+        return getattr(self, item, None)
+
+metrics_config = MetricsConfig()
@@ -0,0 +1,21 @@
+import os
+import socket
+from dotenv import load_dotenv
+load_dotenv()
+
+class Sharding:
+    def __init__(self):
+        # Откуда ingress берёт апдейты: polling | webhook
+        self.ingress = os.getenv('SHARD_INGRESS', 'polling')
+        self.partitions = int(os.getenv('SHARD_PARTITIONS', 16))
+        self.stream_prefix = os.getenv('SHARD_STREAM_PREFIX', 'updates')
+        self.stream_maxlen = int(os.getenv('SHARD_STREAM_MAXLEN', 100000))
+        self.group = os.getenv('SHARD_GROUP', 'workers')
+        self.consumer = os.getenv('SHARD_CONSUMER') or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_ttl = float(os.getenv('SHARD_LEASE_TTL', 15))
+        self.batch = int(os.getenv('SHARD_BATCH', 100))
+
+    def __getattr__(self, item):
+        return getattr(self, item, None)
+
+sharding = Sharding()
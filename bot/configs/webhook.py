@@ -0,0 +1,27 @@
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+class Webhook:
+    def __init__(self):
+        # polling | webhook
+        self.mode = os.getenv('BOT_MODE', 'polling')
+        self.host = os.getenv('WEBHOOK_HOST')
+        self.path = os.getenv('WEBHOOK_PATH', '/webhook')
+        self.secret = os.getenv('WEBHOOK_SECRET')
+        self.app_host = os.getenv('WEBAPP_HOST', '0.0.0.0')
+        self.app_port = int(os.getenv('WEBAPP_PORT', 8080))
+        self.workers = int(os.getenv('WEBHOOK_WORKERS', 32))
+        self.queue_size = int(os.getenv('WEBHOOK_QUEUE_SIZE', 1000))
+        self.dedup_ttl = int(os.getenv('WEBHOOK_DEDUP_TTL', 3600))
+        # Сколько ждать незавершённую работу при остановке (любой режим), секунды
+        self.shutdown_timeout = float(os.getenv('SHUTDOWN_TIMEOUT', 20))
+
+    @property
+    def url(self):
+        return f"{(self.host or '').rstrip('/')}{self.path}"
+
+    def __getattr__(self, item):
+        return getattr(self, item, None)
+
+webhook = Webhook()
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from bot.databases.postgres import User
+
+FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 30))
+
+
+class ActivityTracker:
+    """
+    Write-behind обновление users.last_active.
+    Касания копятся в памяти (одна запись на пользователя) и сбрасываются
+    в БД одним UPDATE ... FROM unnest(...) раз в FLUSH_INTERVAL секунд.
+    """
+    _pending: Dict[int, datetime] = {}
+    _task: Optional[asyncio.Task] = None
+    _lock = asyncio.Lock()
+
+    flushes: int = 0
+    flushed_rows: int = 0
+    failed_flushes: int = 0
+    last_flush_duration: float = 0.0
+    total_flush_duration: float = 0.0
+
+    @classmethod
+    def touch(cls, user_id: int):
+        # Время с зоной: в TIMESTAMP без зоны его переведёт сам PostgreSQL, в зоне сессии —
+        # как и DEFAULT now(), иначе на не-UTC сервере last_active смешает зоны
+        cls._pending[user_id] = datetime.now(timezone.utc)
+
+    @classmethod
+    async def flush(cls) -> int:
+        async with cls._lock:
+            if not cls._pending:
+                return 0
+            batch, cls._pending = cls._pending, {}
+
+            started = time.perf_counter()
+            try:
+                updated = await User.touch_many(list(batch.keys()), list(batch.values()))
+            except Exception as e:
+                cls.failed_flushes += 1
+                # Возвращаем касания обратно, не затирая более свежие
+                for user_id, ts in batch.items():
+                    cls._pending.setdefault(user_id, ts)
+                logger.error(f"Не удалось сбросить last_active ({len(batch)} шт.): {e}")
+                return 0
+            finally:
+                cls.last_flush_duration = time.perf_counter() - started
+                cls.total_flush_duration += cls.last_flush_duration
+
+            cls.flushes += 1
+            cls.flushed_rows += updated
+            return updated
+
+    @classmethod
+    def start(cls):
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._flush_loop())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            await asyncio.gather(cls._task, return_exceptions=True)
+            cls._task = None
+        await cls.flush()
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            "pending": len(cls._pending),
+            "flushes": cls.flushes,
+            "flushed_rows": cls.flushed_rows,
+            "failed_flushes": cls.failed_flushes,
+            "last_flush_duration": cls.last_flush_duration,
+            "total_flush_duration": cls.total_flush_duration,
+        }
+
+    @classmethod
+    async def _flush_loop(cls):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await cls.flush()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from typing import List, Optional, Set
+
+from loguru import logger
+
+from bot.configs.databases import r
+from bot.databases.postgres import Admin
+
+CHANNEL = 'admins:invalidate'
+REFRESH_INTERVAL = float(os.getenv('ADMIN_CACHE_TTL', 300))
+
+
+class AdminCache:
+    """
+    Множество users.id администраторов в памяти процесса.
+    Загружается при старте, обновляется по таймеру и мгновенно сбрасывается
+    на всех запущенных инстансах через Redis pub/sub при изменении таблицы admins.
+    """
+    ids: Set[int] = set()
+    loaded_at: float = 0.0
+
+    _tasks: List[asyncio.Task] = []
+
+    @classmethod
+    def is_admin(cls, users_id: int) -> bool:
+        return users_id in cls.ids
+
+    @classmethod
+    async def reload(cls):
+        cls.ids = await Admin.select_all_ids()
+        cls.loaded_at = time.monotonic()
+
+    @classmethod
+    async def start(cls):
+        await cls.reload()
+        cls._tasks = [
+            asyncio.create_task(cls._refresh_loop()),
+            asyncio.create_task(cls._listen_loop()),
+        ]
+        logger.info(f"Загружено администраторов: {len(cls.ids)}")
+
+    @classmethod
+    async def stop(cls):
+        for task in cls._tasks:
+            task.cancel()
+        await asyncio.gather(*cls._tasks, return_exceptions=True)
+        cls._tasks = []
+
+    @classmethod
+    async def add(cls, users_id: int, added_by: Optional[int] = None):
+        await Admin.insert(users_id, added_by)
+        await cls.invalidate()
+
+    @classmethod
+    async def remove(cls, users_id: int):
+        await Admin.delete(users_id)
+        await cls.invalidate()
+
+    @classmethod
+    async def invalidate(cls):
+        """Перечитать список локально и оповестить остальные инстансы."""
+        await cls.reload()
+        await r.publish(CHANNEL, str(time.time()))
+
+    @classmethod
+    async def _refresh_loop(cls):
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+            try:
+                await cls.reload()
+            except Exception as e:
+                logger.error(f"Не удалось обновить список администраторов: {e}")
+
+    @classmethod
+    async def _listen_loop(cls):
+        while True:
+            try:
+                pubsub = r.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(CHANNEL)
+                try:
+                    while True:
+                        # Короткий таймаут чтения, чтобы не упираться в socket_timeout пула
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message and message.get('type') == 'message':
+                            await cls.reload()
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Потеряна подписка на {CHANNEL}: {e}")
+                # Пока подписки нет, изменения могли пройти мимо — перечитываем после переподключения
+                await asyncio.sleep(5)
+                try:
+                    await cls.reload()
+                except Exception:
+                    pass
@@ -0,0 +1,92 @@
+"""
+Проверка, что каждый зарегистрированный запрос из bot/databases/postgres.py
+может выполняться по индексу.
+
+Для каждого запроса строится план EXPLAIN (FORMAT JSON) при SET LOCAL enable_seqscan = off:
+если подходящего индекса нет, планировщик всё равно выберет Seq Scan — это и считается ошибкой.
+Запросы не выполняются (EXPLAIN без ANALYZE), поэтому проверку можно гонять на рабочей базе.
+
+    python -m bot.databases.explain     # код выхода 1, если есть запросы без индекса
+
+Та же проверка есть в тестах (tests/test_explain.py) — там она пропускается, если PostgreSQL недоступен.
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+import asyncpg
+
+from bot.configs import db_pool
+from bot.configs.databases import postgresql
+from bot.databases import postgres  # noqa: F401 — регистрирует запросы
+from bot.databases.migrations import migrate
+
+# Пример значения для параметра по имени типа PostgreSQL
+_SAMPLES: Dict[str, Any] = {
+    "int2": 1, "int4": 1, "int8": 1,
+    "text": "x", "varchar": "x", "bool": False,
+    "timestamp": datetime(2000, 1, 1),
+    "_int4": [1], "_int8": [1], "_text": ["x"],
+    "_timestamp": [datetime(2000, 1, 1)],
+    "_timestamptz": [datetime(2000, 1, 1, tzinfo=timezone.utc)],
+}
+
+
+def scans(plan: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Все узлы чтения таблиц в плане: [(тип узла, таблица), ...]."""
+    found = []
+    if "Relation Name" in plan:
+        found.append((plan["Node Type"], plan["Relation Name"]))
+    for child in plan.get("Plans", []):
+        found += scans(child)
+    return found
+
+
+async def explain(conn: asyncpg.Connection, query: str) -> Dict[str, Any]:
+    """План запроса при запрещённом Seq Scan (сам запрос не выполняется)."""
+    stmt = await conn.prepare(query)
+    args = [_SAMPLES[p.name] for p in stmt.get_parameters()]
+    async with conn.transaction():
+        await conn.execute("SET LOCAL enable_seqscan = off")
+        raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *args)
+    return json.loads(raw)[0]["Plan"]
+
+
+async def check(conn: asyncpg.Connection) -> Dict[str, List[str]]:
+    """name -> таблицы, которые читаются полным сканированием (пусто — всё по индексам)."""
+    result = {}
+    for name, query in db_pool.statements.items():
+        plan = await explain(conn, query)
+        result[name] = [table for node, table in scans(plan) if node == "Seq Scan"]
+    return result
+
+
+async def main() -> int:
+    await db_pool.create_pool(
+        user=postgresql.user,
+        password=postgresql.password,
+        database=postgresql.db_name,
+        host=postgresql.host,
+        port=postgresql.port
+    )
+    try:
+        await migrate()
+        async with db_pool.pool.acquire() as conn:
+            result = await check(conn)
+    finally:
+        await db_pool.pool.close()
+
+    failed = 0
+    for name, tables in result.items():
+        if tables:
+            failed += 1
+            print(f"FAIL {name}: Seq Scan по {', '.join(tables)}")
+        else:
+            print(f"ok   {name}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
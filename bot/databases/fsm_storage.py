@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+FSM-хранилище поверх Redis.
+- Состояние, данные и bucket пользователя лежат в одном ключе (msgpack) — всё читается
+  одним GETEX, который заодно продлевает TTL активного диалога.
+- Кэш на время одного апдейта (см. bot/middlewares/fsm_cache.py): повторные get_state()/get_data()
+  в хендлере не ходят в Redis, а между апдейтами — и между процессами — всегда свежие данные.
+- Запись только если значение действительно изменилось; брошенные диалоги истекают по TTL.
+"""
+
+import os
+import typing
+from contextvars import ContextVar
+
+import msgpack
+from aiogram.dispatcher.storage import BaseStorage
+
+from bot.configs.databases import r_binary
+
+FSM_TTL = int(os.getenv('FSM_TTL', 7 * 24 * 3600))
+
+# Индексы полей в записи [state, data, bucket]
+_STATE, _DATA, _BUCKET = 0, 1, 2
+_EMPTY = msgpack.packb([None, {}, {}])
+
+Address = typing.Union[str, int, None]
+
+# (префикс, chat, user) -> сырые байты записи; None — вне апдейта, кэша нет
+_update_cache: ContextVar[typing.Optional[dict]] = ContextVar("fsm_update_cache", default=None)
+
+
+def begin_update():
+    """Начать кэш FSM для текущего апдейта (вызывается из middleware)."""
+    _update_cache.set({})
+
+
+def end_update():
+    _update_cache.set(None)
+
+
+class CachedRedisStorage(BaseStorage):
+    def __init__(self, redis=r_binary, prefix: str = 'fsm2', ttl: int = FSM_TTL):
+        self._redis = redis
+        self._prefix = prefix
+        self._ttl = ttl
+
+    def _key(self, chat, user) -> str:
+        return f"{self._prefix}:{chat}:{user}"
+
+    async def _load_raw(self, chat, user) -> bytes:
+        cache = _update_cache.get()
+        key = self._key(chat, user)
+        raw = cache.get(key) if cache is not None else None
+        if raw is None:
+            raw = await self._redis.getex(key, ex=self._ttl) or _EMPTY
+            if cache is not None:
+                cache[key] = raw
+        return raw
+
+    async def _load(self, chat, user) -> list:
+        # Декодируем каждый раз: вызывающий получает свою копию и может её менять.
+        # Ключи-числа ({msg_id: ...}) допустимы — RedisStorage2 их тоже принимал
+        return msgpack.unpackb(await self._load_raw(chat, user), strict_map_key=False)
+
+    async def _save(self, chat, user, record: list):
+        raw = msgpack.packb(record)
+        if raw == await self._load_raw(chat, user):
+            return
+        if raw == _EMPTY:
+            await self._redis.delete(self._key(chat, user))
+        else:
+            await self._redis.set(self._key(chat, user), raw, ex=self._ttl)
+        cache = _update_cache.get()
+        if cache is not None:
+            cache[self._key(chat, user)] = raw
+
+    async def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+    async def get_state(self, *, chat: Address = None, user: Address = None,
+                        default: typing.Optional[str] = None) -> typing.Optional[str]:
+        chat, user = self.check_address(chat=chat, user=user)
+        return (await self._load(chat, user))[_STATE] or self.resolve_state(default)
+
+    async def get_data(self, *, chat: Address = None, user: Address = None,
+                       default: typing.Optional[dict] = None) -> typing.Dict:
+        chat, user = self.check_address(chat=chat, user=user)
+        return (await self._load(chat, user))[_DATA] or default or {}
+
+    async def set_state(self, *, chat: Address = None, user: Address = None,
+                        state: typing.Optional[typing.AnyStr] = None):
+        chat, user = self.check_address(chat=chat, user=user)
+        record = await self._load(chat, user)
+        record[_STATE] = self.resolve_state(state)
+        await self._save(chat, user, record)
+
+    async def set_data(self, *, chat: Address = None, user: Address = None, data: typing.Dict = None):
+        chat, user = self.check_address(chat=chat, user=user)
+        record = await self._load(chat, user)
+        record[_DATA] = data or {}
+        await self._save(chat, user, record)
+
+    async def update_data(self, *, chat: Address = None, user: Address = None,
+                          data: typing.Dict = None, **kwargs):
+        chat, user = self.check_address(chat=chat, user=user)
+        record = await self._load(chat, user)
+        if data:
+            record[_DATA].update(data)
+        record[_DATA].update(**kwargs)
+        await self._save(chat, user, record)
+
+    async def reset_state(self, *, chat: Address = None, user: Address = None,
+                          with_data: typing.Optional[bool] = True):
+        # Одна запись вместо set_state + set_data
+        chat, user = self.check_address(chat=chat, user=user)
+        record = await self._load(chat, user)
+        record[_STATE] = None
+        if with_data:
+            record[_DATA] = {}
+        await self._save(chat, user, record)
+
+    def has_bucket(self):
+        return True
+
+    async def get_bucket(self, *, chat: Address = None, user: Address = None,
+                         default: typing.Optional[dict] = None) -> typing.Dict:
+        chat, user = self.check_address(chat=chat, user=user)
+        return (await self._load(chat, user))[_BUCKET] or default or {}
+
+    async def set_bucket(self, *, chat: Address = None, user: Address = None, bucket: typing.Dict = None):
+        chat, user = self.check_address(chat=chat, user=user)
+        record = await self._load(chat, user)
+        record[_BUCKET] = bucket or {}
+        await self._save(chat, user, record)
+
+    async def update_bucket(self, *, chat: Address = None, user: Address = None,
+                            bucket: typing.Dict = None, **kwargs):
+        chat, user = self.check_address(chat=chat, user=user)
+        record = await self._load(chat, user)
+        if bucket:
+            record[_BUCKET].update(bucket)
+        record[_BUCKET].update(**kwargs)
+        await self._save(chat, user, record)
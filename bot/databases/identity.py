@@ -0,0 +1,41 @@
+import os
+from aiogram.types import User as TgUser
+
+from bot.databases.postgres import User
+from bot.untils import TTLCache
+
+# user_id (Telegram) -> users.id
+_cache = TTLCache(
+    maxsize=int(os.getenv('IDENTITY_CACHE_SIZE', 50000)),
+    ttl=float(os.getenv('IDENTITY_CACHE_TTL', 3600)),
+)
+
+
+class Identity:
+    @staticmethod
+    async def resolve(from_user: TgUser) -> int:
+        """
+        Вернуть users.id для пользователя Telegram.
+        Известный пользователь берётся из кэша без обращения к БД,
+        неизвестный регистрируется одним INSERT ... ON CONFLICT ... RETURNING id.
+        Активность отмечается отдельно, на каждый апдейт (bot/middlewares/activity.py).
+        """
+        users_id = _cache.get(from_user.id)
+        if users_id is not None:
+            return users_id
+
+        users_id = await User.upsert(
+            from_user.id,
+            from_user.username,
+            from_user.first_name,
+            from_user.last_name,
+            from_user.language_code,
+            bool(from_user.is_premium),
+        )
+        _cache.set(from_user.id, users_id)
+        return users_id
+
+    @staticmethod
+    def forget(user_id: int):
+        """Сбросить запись из кэша (например, после удаления пользователя)."""
+        _cache.pop(user_id)
@@ -0,0 +1,107 @@
+import os
+from typing import List, Tuple
+
+import asyncpg
+from loguru import logger
+
+from bot.configs import db_pool
+
+# Ключ advisory-lock, под которым мигрирует только один инстанс
+ADVISORY_LOCK_KEY = 0x6D696772  # 'migr'
+
+# Таймаут миграций, секунды. POSTGRES_COMMAND_TIMEOUT для них мал: построение индекса
+# на большой таблице (и ожидание блокировки другим инстансом) идёт минутами
+MIGRATION_TIMEOUT = float(os.getenv('POSTGRES_MIGRATION_TIMEOUT', 3600))
+
+# (версия, название, SQL). Только добавлять в конец, уже выпущенные не менять.
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, "create users", """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT UNIQUE NOT NULL,
+            username TEXT,
+            first_name TEXT NOT NULL,
+            last_name TEXT,
+            language_code TEXT,
+            language TEXT,
+            is_premium BOOLEAN DEFAULT FALSE,
+            joined_at TIMESTAMP NOT NULL DEFAULT now(),
+            last_active TIMESTAMP NOT NULL DEFAULT now()
+        );
+    """),
+    (2, "create admins", """
+        CREATE TABLE IF NOT EXISTS admins (
+            id SERIAL PRIMARY KEY,
+            users_id INTEGER NOT NULL,
+            added_by INTEGER DEFAULT 0,
+            added_at TIMESTAMP DEFAULT now()
+        );
+    """),
+    (3, "users.is_blocked", """
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS is_blocked BOOLEAN NOT NULL DEFAULT FALSE;
+    """),
+    (4, "admins keys and indexes", """
+        -- Дубли и «висячие» записи помешают ограничениям
+        DELETE FROM admins a USING admins b WHERE a.users_id = b.users_id AND a.id > b.id;
+        DELETE FROM admins WHERE users_id NOT IN (SELECT id FROM users);
+
+        -- added_by = 0 означал «никто» — теперь это NULL
+        ALTER TABLE admins ALTER COLUMN added_by DROP DEFAULT;
+        UPDATE admins SET added_by = NULL WHERE added_by NOT IN (SELECT id FROM users);
+
+        ALTER TABLE admins ADD CONSTRAINT admins_users_id_key UNIQUE (users_id);
+        ALTER TABLE admins ADD CONSTRAINT admins_users_id_fkey
+            FOREIGN KEY (users_id) REFERENCES users (id) ON DELETE CASCADE;
+        ALTER TABLE admins ADD CONSTRAINT admins_added_by_fkey
+            FOREIGN KEY (added_by) REFERENCES users (id) ON DELETE SET NULL;
+        CREATE INDEX IF NOT EXISTS admins_added_by_idx ON admins (added_by);
+
+        -- Страницы рассылки: WHERE id > $1 AND NOT is_blocked ORDER BY id
+        CREATE INDEX IF NOT EXISTS users_not_blocked_id_idx ON users (id) WHERE NOT is_blocked;
+    """),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+async def _current_version(conn: asyncpg.Connection) -> int:
+    try:
+        return await conn.fetchval("SELECT max(version) FROM schema_version") or 0
+    except asyncpg.UndefinedTableError:
+        return 0
+
+
+async def migrate() -> int:
+    """
+    Применить недостающие миграции. Если схема актуальна — ровно один запрос.
+    Иначе всё выполняется в одной транзакции под advisory-lock, чтобы несколько
+    одновременно стартующих инстансов не мигрировали параллельно.
+    """
+    async with db_pool.pool.acquire() as conn:
+        if await _current_version(conn) >= LATEST:
+            return LATEST
+
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", ADVISORY_LOCK_KEY, timeout=MIGRATION_TIMEOUT)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT now()
+                );
+            """)
+            # Пока ждали блокировку, другой инстанс мог всё сделать
+            version = await _current_version(conn)
+            pending = [m for m in MIGRATIONS if m[0] > version]
+            for number, name, query in pending:
+                await conn.execute(query, timeout=MIGRATION_TIMEOUT)
+                await conn.execute(
+                    "INSERT INTO schema_version (version, name) VALUES ($1, $2)",
+                    number, name
+                )
+                logger.info(f"Миграция {number} применена: {name}")
+
+    if pending:
+        # Подготовленные до миграции запросы могут ссылаться на старую схему
+        await db_pool.pool.expire_connections()
+    return LATEST
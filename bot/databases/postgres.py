@@ -1,65 +1,155 @@
-from typing import Optional, Tuple
+from typing import List, Optional, Set, Tuple
+from datetime import datetime
+
 from bot.configs import db_pool
-from datetime import datetime, timedelta
-from aiogram.types import Message, CallbackQuery
-import asyncpg
-from typing import Dict, Any
+from bot.configs.db_pool import register_statement
+
+USER_COLUMNS = "id, user_id, username, first_name, last_name, language_code, language, is_premium, joined_at, last_active, is_blocked"
+ADMIN_COLUMNS = "id, users_id, added_by, added_at"
+
+
+class UserRecord:
+    __slots__ = ("id", "user_id", "username", "first_name", "last_name",
+                 "language_code", "language", "is_premium", "joined_at", "last_active", "is_blocked")
+
+    def __init__(self, id, user_id, username, first_name, last_name,
+                 language_code, language, is_premium, joined_at, last_active, is_blocked):
+        self.id = id
+        self.user_id = user_id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+        self.language_code = language_code
+        self.language = language
+        self.is_premium = is_premium
+        self.joined_at = joined_at
+        self.last_active = last_active
+        self.is_blocked = is_blocked
+
+    def __repr__(self):
+        return f"UserRecord(id={self.id}, user_id={self.user_id}, username={self.username!r})"
+
+
+class AdminRecord:
+    __slots__ = ("id", "users_id", "added_by", "added_at")
+
+    def __init__(self, id, users_id, added_by, added_at):
+        self.id = id
+        self.users_id = users_id
+        self.added_by = added_by
+        self.added_at = added_at
+
+    def __repr__(self):
+        return f"AdminRecord(id={self.id}, users_id={self.users_id}, added_by={self.added_by})"
 
 
 class User:
+    SELECT = register_statement("user_select", f"SELECT {USER_COLUMNS} FROM users WHERE user_id = $1")
+    SELECT_ID = register_statement("user_select_id", "SELECT id FROM users WHERE user_id = $1")
+    SELECT_BY_ID = register_statement("user_select_by_id", f"SELECT {USER_COLUMNS} FROM users WHERE id = $1")
+    INSERT = register_statement("user_insert", """
+        INSERT INTO users (user_id, username, first_name, last_name, language_code, is_premium)
+        VALUES ($1, $2, $3, $4, $5, $6)
+    """)
+    UPSERT = register_statement("user_upsert", """
+        INSERT INTO users (user_id, username, first_name, last_name, language_code, is_premium)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = EXCLUDED.username,
+            first_name = EXCLUDED.first_name,
+            last_name = EXCLUDED.last_name,
+            language_code = EXCLUDED.language_code,
+            is_premium = EXCLUDED.is_premium
+        RETURNING id
+    """)
+    TOUCH_MANY = register_statement("user_touch_many", """
+        UPDATE users AS u
+        SET last_active = v.ts
+        FROM unnest($1::bigint[], $2::timestamptz[]) AS v(user_id, ts)
+        WHERE u.user_id = v.user_id AND u.last_active < v.ts
+    """)
+    BROADCAST_PAGE = register_statement("user_broadcast_page", """
+        SELECT id, user_id FROM users
+        WHERE id > $1 AND NOT is_blocked
+        ORDER BY id
+        LIMIT $2
+    """)
+    MARK_BLOCKED = register_statement(
+        "user_mark_blocked",
+        "UPDATE users SET is_blocked = TRUE WHERE user_id = ANY($1::bigint[])"
+    )
+
     @staticmethod
-    async def select(user_id):
-        conn: asyncpg.Connection = await db_pool.pool.acquire()
-        try:
-            row = await conn.fetchrow("SELECT * FROM users WHERE user_id = $1", user_id)
-            return dict(row) if row else None
-        finally:
-            await db_pool.pool.release(conn)
+    async def select(user_id, replica: bool = True) -> Optional[UserRecord]:
+        row = await db_pool.fetchrow(User.SELECT, user_id, replica=replica)
+        return UserRecord(*row) if row else None
 
     @staticmethod
-    async def select_id(user_id):
-        conn: asyncpg.Connection = await db_pool.pool.acquire()
-        try:
-            row = await conn.fetchrow("SELECT id FROM users WHERE user_id = $1", user_id)
-            return row["id"] if row else None
-        finally:
-            await db_pool.pool.release(conn)
+    async def select_id(user_id, replica: bool = True) -> Optional[int]:
+        return await db_pool.fetchval(User.SELECT_ID, user_id, replica=replica)
 
     @staticmethod
-    async def select_by_id(id):
-        conn: asyncpg.Connection = await db_pool.pool.acquire()
-        try:
-            row = await conn.fetchrow("SELECT * FROM users WHERE id = $1", id)
-            return dict(row) if row else None
-        finally:
-            await db_pool.pool.release(conn)
+    async def select_by_id(id, replica: bool = True) -> Optional[UserRecord]:
+        row = await db_pool.fetchrow(User.SELECT_BY_ID, id, replica=replica)
+        return UserRecord(*row) if row else None
 
     @staticmethod
     async def insert(user_id, username, first_name, last_name, language_code, is_premium):
-        conn: asyncpg.Connection = await db_pool.pool.acquire()
-        try:
-            await conn.execute("""
-                INSERT INTO users (user_id, username, first_name, last_name, language_code, is_premium)
-                VALUES ($1, $2, $3, $4, $5, $6)
-            """, user_id, username, first_name, last_name, language_code, is_premium)
-        finally:
-            await db_pool.pool.release(conn)
+        await db_pool.execute(User.INSERT, user_id, username, first_name, last_name, language_code, is_premium)
+
+    @staticmethod
+    async def upsert(user_id, username, first_name, last_name, language_code, is_premium) -> int:
+        """Вставить пользователя или обновить профиль — в любом случае вернуть users.id за один запрос."""
+        return await db_pool.fetchval(User.UPSERT, user_id, username, first_name, last_name, language_code, is_premium)
+
+    @staticmethod
+    async def touch_many(user_ids: List[int], timestamps: List[datetime]) -> int:
+        """Пакетно обновить last_active одним запросом. Возвращает число обновлённых строк."""
+        status = await db_pool.execute(User.TOUCH_MANY, user_ids, timestamps)
+        return int(status.split()[-1])
+
+    @staticmethod
+    async def broadcast_page(after_id: int, limit: int) -> List[Tuple[int, int]]:
+        """
+        Следующая страница получателей рассылки (keyset по users.id): [(id, user_id), ...].
+        Читается с реплики: отставание на пару секунд для рассылки не важно.
+        """
+        rows = await db_pool.fetch(User.BROADCAST_PAGE, after_id, limit, replica=True)
+        return [(row[0], row[1]) for row in rows]
+
+    @staticmethod
+    async def mark_blocked(user_ids: List[int]):
+        await db_pool.execute(User.MARK_BLOCKED, user_ids)
 
 class Admin:
+    SELECT_ID = register_statement("admin_select_id", "SELECT id FROM admins WHERE users_id = $1")
+    SELECT = register_statement("admin_select", f"SELECT {ADMIN_COLUMNS} FROM admins WHERE users_id = $1")
+    SELECT_ALL_IDS = register_statement("admin_select_all_ids", "SELECT users_id FROM admins")
+    INSERT = register_statement(
+        "admin_insert",
+        "INSERT INTO admins (users_id, added_by) VALUES ($1, $2) ON CONFLICT (users_id) DO NOTHING"
+    )
+    DELETE = register_statement("admin_delete", "DELETE FROM admins WHERE users_id = $1")
+
+    @staticmethod
+    async def select_id(users_id: int, replica: bool = True) -> Optional[int]:
+        return await db_pool.fetchval(Admin.SELECT_ID, users_id, replica=replica)
+
+    @staticmethod
+    async def select(user_id: int, replica: bool = True) -> Optional[AdminRecord]:
+        row = await db_pool.fetchrow(Admin.SELECT, user_id, replica=replica)
+        return AdminRecord(*row) if row else None
+
+    @staticmethod
+    async def select_all_ids() -> Set[int]:
+        # Только primary: AdminCache перечитывает список сразу после add/remove
+        rows = await db_pool.fetch(Admin.SELECT_ALL_IDS)
+        return {row[0] for row in rows}
+
     @staticmethod
-    async def select_id(users_id: int) -> Optional[int]:
-        conn: asyncpg.Connection = await db_pool.pool.acquire()
-        try:
-            row = await conn.fetchrow("SELECT id FROM admins WHERE users_id = $1", users_id)
-            return row["id"] if row else None
-        finally:
-            await db_pool.pool.release(conn)
+    async def insert(users_id: int, added_by: Optional[int] = None):
+        await db_pool.execute(Admin.INSERT, users_id, added_by)
 
     @staticmethod
-    async def select(user_id: int) -> Optional[Dict[str, Any]]:
-        conn: asyncpg.Connection = await db_pool.pool.acquire()
-        try:
-            row = await conn.fetchrow("SELECT * FROM admins WHERE users_id = $1", user_id)
-            return dict(row) if row else None
-        finally:
-            await db_pool.pool.release(conn)
\ No newline at end of file
+    async def delete(users_id: int):
+        await db_pool.execute(Admin.DELETE, users_id)
@@ -1,3 +1,93 @@
 import json
-from bot.configs.databases import r
-from loguru import logger
\ No newline at end of file
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from bot.configs.databases import r, redis_pool, r_binary, redis_binary_pool
+from loguru import logger
+
+# Сколько команд отправлять в одном пайплайне
+PIPELINE_CHUNK = 500
+
+
+def _chunks(items: List, size: int = PIPELINE_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def get_many(keys: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Получить значения пачкой ключей (MGET по частям)."""
+    keys = list(keys)
+    result: Dict[str, Optional[str]] = {}
+    for part in _chunks(keys):
+        values = await r.mget(part)
+        result.update(zip(part, values))
+    return result
+
+
+async def set_many(mapping: Mapping[str, Any], ex: Optional[int] = None):
+    """Записать пачку значений одним пайплайном (без транзакции), опционально с TTL."""
+    items = list(mapping.items())
+    for part in _chunks(items):
+        async with r.pipeline(transaction=False) as pipe:
+            for key, value in part:
+                pipe.set(key, value, ex=ex)
+            await pipe.execute()
+
+
+async def get_json_many(keys: Iterable[str]) -> Dict[str, Any]:
+    result = {}
+    for key, raw in (await get_many(keys)).items():
+        if raw is None:
+            result[key] = None
+            continue
+        try:
+            result[key] = json.loads(raw)
+        except ValueError:
+            logger.warning(f"Некорректный JSON в ключе {key}")
+            result[key] = None
+    return result
+
+
+async def set_json_many(mapping: Mapping[str, Any], ex: Optional[int] = None):
+    await set_many({key: json.dumps(value, ensure_ascii=False) for key, value in mapping.items()}, ex=ex)
+
+
+async def delete_many(keys: Iterable[str]) -> int:
+    deleted = 0
+    for part in _chunks(list(keys)):
+        deleted += await r.delete(*part)
+    return deleted
+
+
+# Аренда (lease): ключ со значением-владельцем и TTL. Продлить/снять — только если она всё ещё наша
+_RENEW_LEASE = r.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+""")
+_RELEASE_LEASE = r.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+""")
+
+
+async def acquire_lease(key: str, owner: str, ttl_ms: int) -> bool:
+    return bool(await r.set(key, owner, nx=True, px=ttl_ms))
+
+
+async def renew_lease(key: str, owner: str, ttl_ms: int) -> bool:
+    return bool(await _RENEW_LEASE(keys=[key], args=[owner, ttl_ms]))
+
+
+async def release_lease(key: str, owner: str) -> bool:
+    return bool(await _RELEASE_LEASE(keys=[key], args=[owner]))
+
+
+async def close():
+    """Закрыть клиент и все соединения пула."""
+    await r.aclose()
+    await r_binary.aclose()
+    await redis_pool.disconnect()
+    await redis_binary_pool.disconnect()
@@ -1,5 +1,6 @@
 from functools import wraps
-from bot.databases.postgres import User, Admin
+from bot.databases.admins import AdminCache
+from bot.databases.identity import Identity
 from datetime import datetime
 from aiogram.types import Message, CallbackQuery
 from loguru import logger
@@ -7,23 +8,11 @@ from loguru import logger
 def admin_required(func):
     @wraps(func)
     async def wrapper(message: Message, *args, **kwargs):
-        user_id = message.from_user.id
         from_user = message.from_user
         try:
-            users_id = await User.select_id(user_id)
-            if not users_id:
-                await User.insert(
-                    user_id,
-                    from_user.username,
-                    from_user.first_name,
-                    from_user.last_name,
-                    from_user.language_code,
-                    from_user.is_premium
-                )
-                users_id = await User.select_id(user_id)
+            users_id = await Identity.resolve(from_user)
 
-            admin = await Admin.select_id(users_id)
-            if not admin:
+            if not AdminCache.is_admin(users_id):
                 return await message.answer(
                     '🚫 <b>У вас нет доступа</b>\nВы не являетесь администратором.',
                     parse_mode='html'
@@ -43,24 +32,12 @@ def admin_required(func):
 def admin_required_callback(func):
     @wraps(func)
     async def wrapper(callback: CallbackQuery, *args, **kwargs):
-        user_id = callback.from_user.id
         from_user = callback.from_user
 
         try:
-            users_id = await User.select_id(user_id)
-            if not users_id:
-                await User.insert(
-                    user_id,
-                    from_user.username,
-                    from_user.first_name,
-                    from_user.last_name,
-                    from_user.language_code,
-                    from_user.is_premium
-                )
-                users_id = await User.select_id(user_id)
+            users_id = await Identity.resolve(from_user)
 
-            admin = await Admin.select_id(users_id)
-            if not admin:
+            if not AdminCache.is_admin(users_id):
                 return await callback.answer(
                     '🚫 У вас нет доступа\nВы не являетесь администратором',
                     show_alert=True
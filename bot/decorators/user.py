@@ -1,5 +1,5 @@
 from functools import wraps
-from bot.databases.postgres import User, Admin
+from bot.databases.identity import Identity
 from datetime import datetime
 from aiogram.types import Message, CallbackQuery
 from loguru import logger
@@ -7,20 +7,9 @@ from loguru import logger
 def user_required(func):
     @wraps(func)
     async def wrapper(message: Message, *args, **kwargs):
-        user_id = message.from_user.id
         from_user = message.from_user
         try:
-            users_id = await User.select_id(user_id)
-            if not users_id:
-                await User.insert(
-                    user_id,
-                    from_user.username,
-                    from_user.first_name,
-                    from_user.last_name,
-                    from_user.language_code,
-                    from_user.is_premium
-                )
-                users_id = await User.select_id(user_id)
+            users_id = await Identity.resolve(from_user)
 
             return await func(message, *args, **kwargs)
 
@@ -36,21 +25,10 @@ def user_required(func):
 def user_required_callback(func):
     @wraps(func)
     async def wrapper(callback: CallbackQuery, *args, **kwargs):
-        user_id = callback.from_user.id
         from_user = callback.from_user
 
         try:
-            users_id = await User.select_id(user_id)
-            if not users_id:
-                await User.insert(
-                    user_id,
-                    from_user.username,
-                    from_user.first_name,
-                    from_user.last_name,
-                    from_user.language_code,
-                    from_user.is_premium
-                )
-                users_id = await User.select_id(user_id)
+            users_id = await Identity.resolve(from_user)
 
             return await func(callback, *args, **kwargs)
 
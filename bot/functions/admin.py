@@ -0,0 +1,300 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from aiogram.types import Message, CallbackQuery
+from aiogram.utils.exceptions import ChatNotFound, MessageNotModified, Unauthorized
+from loguru import logger
+
+from bot.configs.databases import r
+from bot.databases.postgres import User
+from bot.databases.redis import acquire_lease, release_lease, renew_lease
+from bot.keyboards.admin import *
+from bot.other.outbound import Outbound, PRIORITY_LOW
+
+PAGE_SIZE = int(os.getenv('BROADCAST_PAGE_SIZE', 500))
+CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', 25))
+# Рассылку ведёт ровно один процесс — тот, кто держит аренду; остальные ждут и подхватят её
+LEASE_TTL = float(os.getenv('BROADCAST_LEASE_TTL', 30))
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+ACTIVE_KEY = 'broadcast:active'
+
+# Завершить рассылку, только если она ещё идёт: отмена не должна затирать "done", и наоборот
+_FINISH = r.register_script("""
+if redis.call('HGET', KEYS[1], 'status') ~= 'running' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[1], 'finished_at', ARGV[2])
+redis.call('SREM', KEYS[2], ARGV[3])
+redis.call('DEL', KEYS[3])
+return 1
+""")
+
+
+def _key(job_id: str, *parts) -> str:
+    return ':'.join(('broadcast', job_id) + parts)
+
+
+class Broadcast:
+    """
+    Возобновляемая рассылка всем пользователям (копия сообщения администратора).
+    Получатели читаются страницами по users.id (keyset), прогресс и ошибки хранятся в Redis:
+    после рестарта рассылка продолжается с последней завершённой страницы,
+    а уже отправленные в незавершённой странице повторно не получат сообщение.
+    Каждую рассылку ведёт один процесс — владелец аренды broadcast:{id}:lease;
+    остальные инстансы ждут и подхватывают её, если владелец пропал.
+    """
+    _tasks: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    async def create(cls, from_chat_id: int, message_id: int, created_by: int) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.hset(_key(job_id), mapping={
+                "from_chat_id": from_chat_id,
+                "message_id": message_id,
+                "created_by": created_by,
+                "created_at": int(time.time()),
+                "status": "running",
+                "last_id": 0,
+                "sent": 0,
+                "failed": 0,
+                "blocked": 0,
+            })
+            pipe.sadd(ACTIVE_KEY, job_id)
+            await pipe.execute()
+        cls._spawn(job_id)
+        return job_id
+
+    @classmethod
+    async def resume_all(cls):
+        """Продолжить незавершённые рассылки (вызывается при старте)."""
+        for job_id in await r.smembers(ACTIVE_KEY):
+            logger.info(f"Продолжаем рассылку {job_id}")
+            cls._spawn(job_id)
+
+    @classmethod
+    async def stop(cls):
+        """Остановить рассылки этого процесса; прогресс остаётся в Redis."""
+        for task in cls._tasks.values():
+            task.cancel()
+        await asyncio.gather(*cls._tasks.values(), return_exceptions=True)
+        cls._tasks = {}
+
+    @classmethod
+    async def cancel(cls, job_id: str) -> Optional[str]:
+        """Отменить рассылку. Возвращает её итоговый статус (None — рассылки нет)."""
+        if not await r.exists(_key(job_id)):
+            return None
+        if not await cls._finish(job_id, "cancelled"):
+            # Уже завершена — статус не трогаем
+            return await r.hget(_key(job_id), "status")
+        task = cls._tasks.pop(job_id, None)
+        if task:
+            task.cancel()
+        return "cancelled"
+
+    @staticmethod
+    async def status(job_id: str) -> Optional[Dict[str, str]]:
+        job = await r.hgetall(_key(job_id))
+        return job or None
+
+    @staticmethod
+    async def failures(job_id: str, limit: int = 20) -> Dict[str, str]:
+        failed = {}
+        async for user_id, error in r.hscan_iter(_key(job_id, 'failed'), count=limit):
+            failed[user_id] = error
+            if len(failed) >= limit:
+                break
+        return failed
+
+    @classmethod
+    def _spawn(cls, job_id: str):
+        task = cls._tasks.get(job_id)
+        if task is None or task.done():
+            cls._tasks[job_id] = asyncio.create_task(cls._run(job_id))
+
+    @staticmethod
+    async def _finish(job_id: str, status: str) -> bool:
+        """Перевести рассылку из running в status. False — она уже была завершена."""
+        return bool(await _FINISH(
+            keys=[_key(job_id), ACTIVE_KEY, _key(job_id, 'page')],
+            args=[status, int(time.time()), job_id]
+        ))
+
+    @staticmethod
+    async def _wait_lease(job_id: str) -> bool:
+        """Дождаться аренды рассылки. False — рассылка больше не идёт, ждать нечего."""
+        while not await acquire_lease(_key(job_id, 'lease'), OWNER, int(LEASE_TTL * 1000)):
+            if await r.hget(_key(job_id), "status") != "running":
+                return False
+            await asyncio.sleep(LEASE_TTL)
+        return True
+
+    @staticmethod
+    async def _keep_lease(job_id: str, run: asyncio.Task):
+        while True:
+            await asyncio.sleep(LEASE_TTL / 3)
+            if not await renew_lease(_key(job_id, 'lease'), OWNER, int(LEASE_TTL * 1000)):
+                # Аренду уже мог взять другой процесс — останавливаемся, чтобы не слать дважды
+                logger.warning(f"Рассылка {job_id}: аренда потеряна, останавливаемся")
+                run.cancel()
+                return
+
+    @classmethod
+    async def _run(cls, job_id: str):
+        keeper = None
+        try:
+            if not await cls._wait_lease(job_id):
+                await r.srem(ACTIVE_KEY, job_id)
+                return
+            keeper = asyncio.create_task(cls._keep_lease(job_id, asyncio.current_task()))
+
+            job = await r.hgetall(_key(job_id))
+            if not job or job.get("status") != "running":
+                await r.srem(ACTIVE_KEY, job_id)
+                return
+            from_chat_id = int(job["from_chat_id"])
+            message_id = int(job["message_id"])
+            last_id = int(job["last_id"])
+            semaphore = asyncio.Semaphore(CONCURRENCY)
+
+            async def send(user_id: int) -> str:
+                async with semaphore:
+                    # Отмену с другого инстанса видно сразу, а не после целой страницы
+                    if await r.hget(_key(job_id), "status") != "running":
+                        return "stopped"
+                    try:
+                        await Outbound.copy_message(user_id, from_chat_id, message_id, priority=PRIORITY_LOW)
+                    except (Unauthorized, ChatNotFound) as e:
+                        await r.hset(_key(job_id, 'failed'), str(user_id), str(e))
+                        return "blocked"
+                    except Exception as e:
+                        await r.hset(_key(job_id, 'failed'), str(user_id), str(e))
+                        return "failed"
+                    # sent считаем здесь же: после рестарта отправленные в странице пропускаются
+                    async with r.pipeline(transaction=True) as pipe:
+                        pipe.sadd(_key(job_id, 'page'), user_id)
+                        pipe.hincrby(_key(job_id), "sent", 1)
+                        await pipe.execute()
+                    return "sent"
+
+            while True:
+                # Рассылку могли отменить с другого инстанса
+                if await r.hget(_key(job_id), "status") != "running":
+                    return
+                page = await User.broadcast_page(last_id, PAGE_SIZE)
+                if not page:
+                    break
+
+                # Отправленные до рестарта в этой же странице пропускаем
+                done = {int(x) for x in await r.smembers(_key(job_id, 'page'))}
+                recipients = [user_id for _, user_id in page if user_id not in done]
+                results = await asyncio.gather(*(send(user_id) for user_id in recipients))
+
+                blocked: List[int] = [u for u, res in zip(recipients, results) if res == "blocked"]
+                if blocked:
+                    await User.mark_blocked(blocked)
+
+                # Рассылку отменили посреди страницы — досчитываем ошибки, last_id не двигаем
+                stopped = "stopped" in results
+                async with r.pipeline(transaction=True) as pipe:
+                    if not stopped:
+                        last_id = page[-1][0]
+                        pipe.hset(_key(job_id), "last_id", last_id)
+                    pipe.delete(_key(job_id, 'page'))
+                    pipe.hincrby(_key(job_id), "failed", results.count("failed"))
+                    pipe.hincrby(_key(job_id), "blocked", len(blocked))
+                    await pipe.execute()
+                if stopped:
+                    return
+
+            if await cls._finish(job_id, "done"):
+                logger.info(f"Рассылка {job_id} завершена")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Рассылка {job_id} прервана: {e}")
+        finally:
+            cls._tasks.pop(job_id, None)
+            if keeper is not None:
+                keeper.cancel()
+                try:
+                    await release_lease(_key(job_id, 'lease'), OWNER)
+                except Exception as e:
+                    logger.warning(f"Рассылка {job_id}: не удалось снять аренду: {e!r}")
+
+
+def _fmt_status(job_id: str, job: Dict[str, str]) -> str:
+    return (
+        f"📣 <b>Рассылка</b> <code>{job_id}</code>\n"
+        f"• <b>Статус:</b> {job.get('status')}\n"
+        f"• <b>Отправлено:</b> {job.get('sent', 0)}\n"
+        f"• <b>Заблокировали бота:</b> {job.get('blocked', 0)}\n"
+        f"• <b>Ошибок:</b> {job.get('failed', 0)}\n"
+        f"• <b>Последний users.id:</b> {job.get('last_id', 0)}"
+    )
+
+
+async def broadcast(message: Message):
+    if not message.reply_to_message:
+        return await message.answer(
+            'Ответьте командой <code>/broadcast</code> на сообщение, которое нужно разослать.',
+            parse_mode='html'
+        )
+    job_id = await Broadcast.create(message.chat.id, message.reply_to_message.message_id, message.from_user.id)
+    await message.answer(
+        f'📣 Рассылка <code>{job_id}</code> запущена.\n'
+        f'Статус: <code>/broadcast_status {job_id}</code>',
+        parse_mode='html',
+        reply_markup=broadcast_kb(job_id)
+    )
+
+
+async def broadcast_status(message: Message):
+    job_id = message.get_args().strip()
+    if not job_id:
+        active = await r.smembers(ACTIVE_KEY)
+        text = '\n'.join(f'<code>{x}</code>' for x in active) or 'нет'
+        return await message.answer(f'📣 <b>Активные рассылки:</b>\n{text}', parse_mode='html')
+
+    job = await Broadcast.status(job_id)
+    if not job:
+        return await message.answer('Рассылка не найдена.')
+    await message.answer(_fmt_status(job_id, job), parse_mode='html', reply_markup=broadcast_kb(job_id))
+
+
+async def broadcast_cancel(message: Message):
+    job_id = message.get_args().strip()
+    status = await Broadcast.cancel(job_id) if job_id else None
+    if status is None:
+        return await message.answer('Рассылка не найдена.')
+    if status != "cancelled":
+        return await message.answer(f'Рассылка <code>{job_id}</code> уже завершена: {status}.', parse_mode='html')
+    await message.answer(f'⛔️ Рассылка <code>{job_id}</code> остановлена.', parse_mode='html')
+
+
+async def broadcast_status_callback(callback: CallbackQuery):
+    job_id = callback.data.split(':', 2)[2]
+    job = await Broadcast.status(job_id)
+    if not job:
+        return await callback.answer('Рассылка не найдена.', show_alert=True)
+    try:
+        await callback.message.edit_text(_fmt_status(job_id, job), parse_mode='html', reply_markup=broadcast_kb(job_id))
+    except MessageNotModified:
+        pass
+    await callback.answer()
+
+
+async def broadcast_cancel_callback(callback: CallbackQuery):
+    job_id = callback.data.split(':', 2)[2]
+    status = await Broadcast.cancel(job_id)
+    if status is None:
+        return await callback.answer('Рассылка не найдена.', show_alert=True)
+    if status != "cancelled":
+        return await callback.answer(f'Рассылка уже завершена: {status}.', show_alert=True)
+    await callback.answer('⛔️ Рассылка остановлена.')
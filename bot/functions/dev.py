@@ -1,9 +1,14 @@
 from typing import Union
 from aiogram.types import Message, CallbackQuery
 from aiogram.dispatcher.storage import FSMContext
+from aiogram.utils.markdown import quote_html
 from pprint import pformat
 
-from bot.other.sysinfo import _fmt_info, get_system_info
+from bot.configs import db_pool
+from bot.databases.activity import ActivityTracker
+from bot.middlewares.metrics import Metrics
+from bot.other.outbound import Outbound, PRIORITY_HIGH
+from bot.other.sampler import SystemSampler
 from bot.untils import _chunk, _get_sender
 
 class DevFunctions:
@@ -56,10 +61,21 @@ class DevFunctions:
         используя уже существующую у тебя get_system_info().
         """
         try:
+            # psutil и sysinfo нужны только здесь — не тянем их при старте бота
+            from bot.other.sysinfo import _fmt_info, get_system_info_async
+
             msg = _get_sender(message_or_callback)
 
+            # Системные метрики и обход процессов собираются, только пока их кто-то смотрит
+            if include_processes:
+                SystemSampler.watch_processes()
+            else:
+                SystemSampler.enable_system()
+
             # Сбор данных
-            info = get_system_info(include_processes=include_processes)
+            info = await get_system_info_async(include_processes=include_processes)
+            # Снимок закэширован и общий — историю добавляем в копию
+            info = {**info, "history": SystemSampler.summary()}
 
             # Красивое форматирование
             html = _fmt_info(info)
@@ -67,7 +83,7 @@ class DevFunctions:
             # Отправка с разбиением
             chunks = _chunk(html)
             for part in chunks:
-                await msg.answer(part, parse_mode="HTML")
+                await Outbound.send_message(msg.chat.id, part, priority=PRIORITY_HIGH, parse_mode="HTML")
 
         except Exception:
             # Сообщение пользователю строго по твоим правилам
@@ -85,4 +101,58 @@ class DevFunctions:
                         "возникла ошибка, администратор постарается решить вашу проблему как можно быстрее"
                     )
                 except Exception:
-                    pass
\ No newline at end of file
+                    pass
+
+    @staticmethod
+    async def pool_info(message: Message):
+        """Состояние пула PostgreSQL и write-behind буфера last_active."""
+        snap = db_pool.metrics.snapshot()
+        activity = ActivityTracker.stats()
+
+        histogram = "\n".join(
+            f"  ≤ {'∞' if le == float('inf') else f'{le * 1000:g} мс'}: {count}"
+            for le, count in snap["acquire_buckets"] if count
+        ) or "  —"
+
+        text = (
+            "🐘 <b>PostgreSQL pool</b>\n"
+            f"• <b>Соединения:</b> {snap['in_use']} занято / {snap['idle']} свободно "
+            f"(min {snap['min_size']}, max {snap['max_size']})\n"
+            f"• <b>QPS:</b> {snap['qps_10s']:.1f} (10 с), {snap['qps_1m']:.1f} (1 мин)\n"
+            f"• <b>Запросов:</b> {snap['queries_total']}, ошибок: {snap['query_errors']}, "
+            f"медленных (≥ {snap['slow_query_threshold'] * 1000:g} мс): {snap['slow_queries']}\n"
+            f"• <b>Ожидание acquire:</b> avg {snap['acquire_avg'] * 1000:.2f} мс, "
+            f"max {snap['acquire_max'] * 1000:.2f} мс\n"
+            f"<pre>{histogram}</pre>\n"
+            f"• <b>Реплики:</b> {snap['replicas_healthy']} из {snap['replicas']} в строю, "
+            f"чтений: {snap['replica_queries']}, откатов на primary: {snap['replica_fallbacks']}\n"
+            "\n🕒 <b>last_active</b>\n"
+            f"• <b>В очереди:</b> {activity['pending']}\n"
+            f"• <b>Сбросов:</b> {activity['flushes']} (ошибок: {activity['failed_flushes']}), "
+            f"строк: {activity['flushed_rows']}\n"
+            f"• <b>Последний сброс:</b> {activity['last_flush_duration'] * 1000:.1f} мс"
+        )
+        await message.answer(text, parse_mode="HTML")
+
+    @staticmethod
+    async def handler_stats(message: Message):
+        """Задержки и ошибки по хендлерам (с момента запуска процесса)."""
+        upd = Metrics.updates
+        lag = SystemSampler.loop_lag.stats(60)
+        lines = [
+            "⏱ <b>Обработка апдейтов</b>",
+            f"• <b>Всего:</b> {upd.count}, в работе: {Metrics.inflight}",
+            f"• <b>p50/p99/max:</b> {upd.percentile(50) * 1000:.1f} / "
+            f"{upd.percentile(99) * 1000:.1f} / {upd.max * 1000:.1f} мс",
+        ]
+        if lag:
+            lines.append(f"• <b>Лаг loop (1 мин):</b> avg {lag['avg'] * 1000:.1f} мс, max {lag['max'] * 1000:.1f} мс")
+        lines.append("\n📋 <b>Хендлеры</b> (кол-во, ошибки, p50 / p99 мс)")
+        for key, st in Metrics.table():
+            h = st.latency
+            lines.append(
+                f"• <code>{quote_html(key)}</code>: {h.count}, {st.errors}, "
+                f"{h.percentile(50) * 1000:.1f} / {h.percentile(99) * 1000:.1f}"
+            )
+        for part in _chunk("\n".join(lines)):
+            await message.answer(part, parse_mode="HTML")
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Отправка локальных медиафайлов с кэшем file_id.
+- Файл хэшируется (SHA-256) в пуле потоков; хэш запоминается по (путь, mtime, размер).
+- file_id, который вернул Telegram, хранится в Redis под media:file_id:{тип}:{хэш},
+  перед Redis — LRU-кэш в процессе. Повторные отправки идут по file_id, без загрузки.
+- Новые файлы загружаются потоком с диска, целиком в память не читаются.
+- Одновременные отправки одного нового файла ждут первую загрузку, а не грузят его снова.
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Any, Callable, Dict, Optional
+
+from aiogram.types import InputFile, Message
+from aiogram.utils.exceptions import WrongFileIdentifier, WrongRemoteFileIdSpecified
+from loguru import logger
+
+from bot.configs.bot import bot
+from bot.configs.databases import r
+from bot.other.outbound import Outbound, PRIORITY_NORMAL
+from bot.untils import TTLCache
+
+FILE_ID_TTL = int(os.getenv('MEDIA_FILE_ID_TTL', 30 * 24 * 3600))
+LOCAL_CACHE_SIZE = int(os.getenv('MEDIA_LOCAL_CACHE_SIZE', 1024))
+LOCAL_CACHE_TTL = float(os.getenv('MEDIA_LOCAL_CACHE_TTL', 600))
+HASH_BLOCK = 1 << 20
+
+# Метод Bot API для каждого типа медиа; все принимают (chat_id, файл, ...)
+_SENDERS: Dict[str, Callable] = {
+    "photo": bot.send_photo,
+    "document": bot.send_document,
+    "video": bot.send_video,
+    "audio": bot.send_audio,
+    "animation": bot.send_animation,
+    "voice": bot.send_voice,
+    "video_note": bot.send_video_note,
+    "sticker": bot.send_sticker,
+}
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_id_of(message: Message, kind: str) -> Optional[str]:
+    media = getattr(message, kind, None)
+    if isinstance(media, list):
+        # Для фото Telegram присылает все размеры, самый большой — последний
+        media = media[-1] if media else None
+    return media.file_id if media is not None else None
+
+
+async def _upload(sender: Callable, chat_id: int, path: str, **kwargs) -> Message:
+    # Файл открывается на каждую попытку: после RetryAfter поток нужно читать с начала
+    with open(path, 'rb') as f:
+        return await sender(chat_id, InputFile(f, filename=os.path.basename(path)), **kwargs)
+
+
+class Media:
+    _digests = TTLCache(maxsize=LOCAL_CACHE_SIZE, ttl=None)
+    _file_ids = TTLCache(maxsize=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+    _uploads: Dict[str, asyncio.Future] = {}
+
+    # Счётчики
+    uploaded: int = 0
+    reused: int = 0
+
+    @classmethod
+    async def digest(cls, path: str) -> str:
+        """SHA-256 файла; пересчитывается только если файл изменился."""
+        st = os.stat(path)
+        cached = cls._digests.get(path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        digest = await asyncio.get_running_loop().run_in_executor(None, _hash_file, path)
+        cls._digests.set(path, (st.st_mtime_ns, st.st_size, digest))
+        return digest
+
+    @classmethod
+    async def get_file_id(cls, key: str) -> Optional[str]:
+        file_id = cls._file_ids.get(key)
+        if file_id is not None:
+            return file_id
+        try:
+            file_id = await r.get(key)
+        except Exception as e:
+            # Без Redis просто загрузим файл заново
+            logger.warning(f"Кэш file_id недоступен: {e!r}")
+            return None
+        if file_id is not None:
+            cls._file_ids.set(key, file_id)
+        return file_id
+
+    @classmethod
+    async def remember(cls, key: str, file_id: str):
+        cls._file_ids.set(key, file_id)
+        try:
+            await r.set(key, file_id, ex=FILE_ID_TTL or None)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить file_id: {e!r}")
+
+    @classmethod
+    async def forget(cls, key: str):
+        cls._file_ids.pop(key)
+        try:
+            await r.delete(key)
+        except Exception as e:
+            logger.warning(f"Не удалось удалить file_id: {e!r}")
+
+    @classmethod
+    async def send(cls, chat_id: int, path: str, kind: str = "document",
+                   priority: int = PRIORITY_NORMAL, **kwargs: Any) -> Message:
+        """
+        Отправить локальный файл через Outbound.
+        kind — тип медиа ("photo", "document", "video", ...), kwargs уходят в метод Bot API.
+        """
+        sender = _SENDERS.get(kind)
+        if sender is None:
+            raise ValueError(f"Неизвестный тип медиа: {kind}")
+        key = f"media:file_id:{kind}:{await cls.digest(path)}"
+
+        file_id = await cls.get_file_id(key)
+        if file_id is None and key in cls._uploads:
+            file_id = await asyncio.shield(cls._uploads[key])
+
+        if file_id is not None:
+            try:
+                message = await Outbound.submit(chat_id, lambda: sender(chat_id, file_id, **kwargs), priority)
+            except (WrongFileIdentifier, WrongRemoteFileIdSpecified):
+                logger.warning(f"file_id для {path} больше не действует — загружаем заново")
+                await cls.forget(key)
+            else:
+                cls.reused += 1
+                return message
+
+        # Результат future — file_id (или None при неудаче); его ждут параллельные отправки
+        future = asyncio.get_running_loop().create_future()
+        cls._uploads[key] = future
+        file_id = None
+        try:
+            message = await Outbound.submit(chat_id, lambda: _upload(sender, chat_id, path, **kwargs), priority)
+            cls.uploaded += 1
+            file_id = _file_id_of(message, kind)
+            if file_id is not None:
+                await cls.remember(key, file_id)
+            return message
+        finally:
+            if cls._uploads.get(key) is future:
+                del cls._uploads[key]
+            future.set_result(file_id)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            "uploaded": cls.uploaded,
+            "reused": cls.reused,
+            "cached_file_ids": len(cls._file_ids),
+            "uploads_in_progress": len(cls._uploads),
+        }
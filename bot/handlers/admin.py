@@ -3,6 +3,7 @@ from aiogram import Dispatcher
 from bot.decorators.admin import admin_required, admin_required_callback
 from bot.functions.admin import *
 from bot.configs.fsm import *
+from bot.middlewares.throttling import rate_limit
 
 def register_handlers(dp: Dispatcher):
     # dp.register_message_handler(
@@ -10,4 +11,16 @@ def register_handlers(dp: Dispatcher):
     #     commands=["admin"],
     #     state="*"
     # )
-    pass
\ No newline at end of file
+    dp.register_message_handler(rate_limit(1, 10)(admin_required(broadcast)), commands=['broadcast'], state='*')
+    dp.register_message_handler(admin_required(broadcast_status), commands=['broadcast_status'], state='*')
+    dp.register_message_handler(admin_required(broadcast_cancel), commands=['broadcast_cancel'], state='*')
+    dp.register_callback_query_handler(
+        admin_required_callback(broadcast_status_callback),
+        lambda c: c.data.startswith('broadcast:status:'),
+        state='*'
+    )
+    dp.register_callback_query_handler(
+        admin_required_callback(broadcast_cancel_callback),
+        lambda c: c.data.startswith('broadcast:cancel:'),
+        state='*'
+    )
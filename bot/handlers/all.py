@@ -3,8 +3,15 @@ from aiogram import Dispatcher
 from bot.handlers.admin import register_handlers as register_admin_handlers
 from bot.handlers.dev import register_handlers as register_dev_handlers
 from bot.handlers.user import register_handlers as register_user_handlers
+from bot.middlewares import activity, fsm_cache, metrics, throttling
 
 def register_all_handlers(dp: Dispatcher):
     register_user_handlers(dp)
     register_dev_handlers(dp)
-    register_admin_handlers(dp)
\ No newline at end of file
+    register_admin_handlers(dp)
+
+def register_all_middlewares(dp: Dispatcher):
+    throttling.setup(dp)
+    activity.setup(dp)
+    fsm_cache.setup(dp)
+    metrics.setup(dp)
@@ -2,6 +2,7 @@ from aiogram import Dispatcher
 
 from bot.decorators.admin import admin_required
 from bot.functions.dev import DevFunctions
+from bot.middlewares.throttling import rate_limit
 
 def register_handlers(dp: Dispatcher):
     dp.register_message_handler(admin_required(DevFunctions.get_user_id), commands=['id'], state='*')
@@ -9,4 +10,6 @@ def register_handlers(dp: Dispatcher):
     dp.register_message_handler(admin_required(DevFunctions.get_message_id), commands=['message_id'], state='*')
 
     dp.register_message_handler(admin_required(DevFunctions.debug), commands=['debug'], state='*')
-    dp.register_message_handler(admin_required(DevFunctions.system_info), commands=['sysinfo'], state='*')
\ No newline at end of file
+    dp.register_message_handler(rate_limit(2, 10)(admin_required(DevFunctions.system_info)), commands=['sysinfo'], state='*')
+    dp.register_message_handler(admin_required(DevFunctions.pool_info), commands=['dbpool'], state='*')
+    dp.register_message_handler(admin_required(DevFunctions.handler_stats), commands=['stats'], state='*')
\ No newline at end of file
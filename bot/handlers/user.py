@@ -1,10 +1,11 @@
 from aiogram import Dispatcher
 
 from bot.functions.user import *
+from bot.middlewares.throttling import rate_limit
 
 def register_handlers(dp: Dispatcher):
     dp.register_message_handler(
-        start,
+        rate_limit(3, 10)(start),
         commands=['start'],
         state='*'
     )
\ No newline at end of file
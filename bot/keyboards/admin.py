@@ -1 +1,11 @@
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
\ No newline at end of file
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot.keyboards import registry
+
+
+@registry.dynamic(maxsize=64)
+def broadcast_kb(job_id: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(row_width=2).add(
+        InlineKeyboardButton('🔄 Статус', callback_data=f'broadcast:status:{job_id}'),
+        InlineKeyboardButton('⛔️ Остановить', callback_data=f'broadcast:cancel:{job_id}'),
+    )
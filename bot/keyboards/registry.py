@@ -0,0 +1,58 @@
+"""
+Реестр клавиатур.
+Статические клавиатуры собираются один раз при импорте и сразу сериализуются в JSON;
+параметризованные (пагинация, переключатели) кэшируются по аргументам в LRU.
+aiogram передаёт строку в reply_markup как есть, поэтому при отправке
+клавиатура уже не пересобирается и не сериализуется повторно.
+"""
+import functools
+import json
+from typing import Any, Callable, Dict, List
+
+from aiogram.types.base import TelegramObject
+
+_static: Dict[str, str] = {}
+_dynamic: List[Callable] = []
+
+
+def serialize(markup: TelegramObject) -> str:
+    return json.dumps(markup.to_python(), ensure_ascii=False, separators=(",", ":"))
+
+
+def static(name: str, markup: TelegramObject) -> str:
+    """Зарегистрировать статическую клавиатуру; возвращает готовый JSON для reply_markup."""
+    if name in _static:
+        raise ValueError(f"Клавиатура {name!r} уже зарегистрирована")
+    raw = _static[name] = serialize(markup)
+    return raw
+
+
+def get(name: str) -> str:
+    return _static[name]
+
+
+def dynamic(maxsize: int = 256):
+    """
+    Декоратор для параметризованной клавиатуры: функция строит разметку,
+    а результат (JSON) мемоизируется по аргументам. Аргументы должны быть хэшируемыми.
+    """
+    def decorator(builder: Callable[..., TelegramObject]) -> Callable[..., str]:
+        @functools.lru_cache(maxsize=maxsize)
+        @functools.wraps(builder)
+        def cached(*args, **kwargs) -> str:
+            return serialize(builder(*args, **kwargs))
+
+        _dynamic.append(cached)
+        return cached
+
+    return decorator
+
+
+def stats() -> Dict[str, Any]:
+    result: Dict[str, Any] = {"static": len(_static)}
+    for cached in _dynamic:
+        info = cached.cache_info()
+        result[f"{cached.__name__}_hits"] = info.hits
+        result[f"{cached.__name__}_misses"] = info.misses
+        result[f"{cached.__name__}_size"] = info.currsize
+    return result
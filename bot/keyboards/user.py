@@ -1 +1,17 @@
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
\ No newline at end of file
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
+
+from bot.keyboards import registry
+
+remove_kb = registry.static('remove', ReplyKeyboardRemove())
+
+
+@registry.dynamic(maxsize=1024)
+def pagination_kb(prefix: str, page: int, pages: int) -> InlineKeyboardMarkup:
+    """Кнопки «назад / N из M / вперёд»; callback_data: {prefix}:{page}."""
+    row = []
+    if page > 1:
+        row.append(InlineKeyboardButton('◀️', callback_data=f'{prefix}:{page - 1}'))
+    row.append(InlineKeyboardButton(f'{page} / {pages}', callback_data='noop'))
+    if page < pages:
+        row.append(InlineKeyboardButton('▶️', callback_data=f'{prefix}:{page + 1}'))
+    return InlineKeyboardMarkup(inline_keyboard=[row])
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Отметка активности: каждый апдейт от пользователя обновляет users.last_active
+(через write-behind буфер ActivityTracker) — независимо от того, какой хендлер
+его обработает и обернут ли он в user_required/admin_required.
+"""
+
+from typing import Optional
+
+from aiogram import Dispatcher, types
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from bot.databases.activity import ActivityTracker
+
+# Поля апдейта, у объекта в которых есть from_user
+_EVENTS = (
+    'message', 'edited_message', 'callback_query', 'inline_query', 'chosen_inline_result',
+    'shipping_query', 'pre_checkout_query', 'my_chat_member', 'chat_member', 'chat_join_request',
+)
+
+
+def _sender_id(update: types.Update) -> Optional[int]:
+    for name in _EVENTS:
+        event = getattr(update, name)
+        if event is not None:
+            return event.from_user.id if event.from_user else None
+    if update.poll_answer is not None:
+        return update.poll_answer.user.id
+    return None
+
+
+class ActivityMiddleware(BaseMiddleware):
+    async def on_pre_process_update(self, update: types.Update, data: dict):
+        # Неизвестных пользователей UPDATE при сбросе просто не найдёт
+        user_id = _sender_id(update)
+        if user_id is not None:
+            ActivityTracker.touch(user_id)
+
+
+def setup(dp: Dispatcher):
+    dp.middleware.setup(ActivityMiddleware())
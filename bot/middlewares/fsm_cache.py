@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+Кэш FSM-хранилища на время одного апдейта: запись из Redis читается один раз,
+сколько бы раз хендлер и декораторы ни спрашивали состояние. После апдейта кэш
+сбрасывается, поэтому другой процесс (webhook/worker) никогда не видит устаревших данных.
+"""
+
+from aiogram import Dispatcher, types
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from bot.databases import fsm_storage
+
+
+class FSMCacheMiddleware(BaseMiddleware):
+    async def on_pre_process_update(self, update: types.Update, data: dict):
+        fsm_storage.begin_update()
+
+    async def on_post_process_update(self, update: types.Update, result, data: dict):
+        fsm_storage.end_update()
+
+
+def setup(dp: Dispatcher):
+    dp.middleware.setup(FSMCacheMiddleware())
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Метрики обработки апдейтов.
+- Время каждого апдейта целиком и по каждому хендлеру (ключ — имя зарегистрированного хендлера:
+  набор ключей конечен, сколько бы разных команд и состояний ни прислали пользователи).
+- HDR-подобные гистограммы задержек (лог-линейные корзины, ~3% точности, фиксированный размер).
+- Счётчики ошибок по хендлерам и лаг event loop (из SystemSampler).
+- Экспорт в текстовом формате Prometheus на локальный HTTP-эндпоинт.
+"""
+
+import time
+from array import array
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Dispatcher, types
+from aiogram.dispatcher.handler import current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiohttp import web
+from loguru import logger
+
+from bot.other.sampler import SystemSampler
+
+
+# Ключ хендлера текущего апдейта — нужен errors_handler'у
+_current_key: ContextVar[str] = ContextVar("metrics_handler_key", default="unknown")
+
+
+class Histogram:
+    """
+    Лог-линейная гистограмма значений в микросекундах.
+    Значения до 2**SUB_BITS хранятся точно, дальше на каждую степень двойки
+    приходится 2**(SUB_BITS-1) корзин — относительная погрешность ~3%.
+    """
+    SUB_BITS = 6
+    MAX_EXP = 36  # до 2**42 мкс — с большим запасом
+    SIZE = (1 << SUB_BITS) + MAX_EXP * (1 << (SUB_BITS - 1))
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * self.SIZE))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def _index(cls, v: int) -> int:
+        if v < (1 << cls.SUB_BITS):
+            return v
+        e = v.bit_length() - cls.SUB_BITS
+        half = 1 << (cls.SUB_BITS - 1)
+        return min(cls.SIZE - 1, (1 << cls.SUB_BITS) + (e - 1) * half + (v >> e) - half)
+
+    @classmethod
+    def _value(cls, index: int) -> float:
+        """Середина корзины, мкс."""
+        if index < (1 << cls.SUB_BITS):
+            return float(index)
+        half = 1 << (cls.SUB_BITS - 1)
+        e, top = divmod(index - (1 << cls.SUB_BITS), half)
+        e += 1
+        return ((top + half) << e) + (1 << e) / 2
+
+    def record(self, seconds: float):
+        us = seconds * 1e6
+        self.counts[self._index(int(us))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """q-й перцентиль в секундах (q от 0 до 100)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(q / 100 * self.count)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= rank:
+                    return min(self._value(i) / 1e6, self.max)
+        return self.max
+
+
+class HandlerStats:
+    __slots__ = ("latency", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+
+
+class Metrics:
+    updates = Histogram()
+    inflight: int = 0
+    handlers: Dict[str, HandlerStats] = {}
+    started_at: float = time.time()
+
+    @classmethod
+    def handler(cls, key: str) -> HandlerStats:
+        stats = cls.handlers.get(key)
+        if stats is None:
+            stats = cls.handlers[key] = HandlerStats()
+        return stats
+
+    @classmethod
+    def table(cls) -> List[Tuple[str, HandlerStats]]:
+        return sorted(cls.handlers.items(), key=lambda kv: kv[1].latency.count, reverse=True)
+
+    @classmethod
+    def render_prometheus(cls) -> str:
+        lines = [
+            "# TYPE bot_updates_inflight gauge",
+            f"bot_updates_inflight {cls.inflight}",
+            "# TYPE bot_update_seconds summary",
+        ]
+        lines += _summary("bot_update_seconds", "", cls.updates)
+        lines.append("# TYPE bot_handler_seconds summary")
+        for key, stats in cls.handlers.items():
+            lines += _summary("bot_handler_seconds", f'handler="{_escape(key)}"', stats.latency)
+        lines.append("# TYPE bot_handler_errors_total counter")
+        for key, stats in cls.handlers.items():
+            lines.append(f'bot_handler_errors_total{{handler="{_escape(key)}"}} {stats.errors}')
+        lag = SystemSampler.loop_lag.last()
+        if lag is not None:
+            lines += ["# TYPE bot_event_loop_lag_seconds gauge", f"bot_event_loop_lag_seconds {lag}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _summary(name: str, labels: str, hist: Histogram) -> List[str]:
+    sep = "," if labels else ""
+    lines = [
+        f'{name}{{{labels}{sep}quantile="{q / 100:g}"}} {hist.percentile(q)}'
+        for q in (50, 90, 99, 99.9)
+    ]
+    suffix = f"{{{labels}}}" if labels else ""
+    lines += [f"{name}_sum{suffix} {hist.total}", f"{name}_count{suffix} {hist.count}"]
+    return lines
+
+
+def _handler_key() -> str:
+    # Не текст команды и не состояние FSM: их задаёт пользователь (catch-all хендлер — бесконечно много меток)
+    handler = current_handler.get(None)
+    return getattr(handler, "__qualname__", None) or getattr(handler, "__name__", "unknown")
+
+
+class MetricsMiddleware(BaseMiddleware):
+    async def on_pre_process_update(self, update: types.Update, data: dict):
+        Metrics.inflight += 1
+        data["_metrics_started"] = time.perf_counter()
+
+    async def on_post_process_update(self, update: types.Update, results, data: dict):
+        Metrics.inflight -= 1
+        started = data.get("_metrics_started")
+        if started is not None:
+            Metrics.updates.record(time.perf_counter() - started)
+
+    async def _start_handler(self, event, data: dict):
+        data["_metrics_key"] = key = _handler_key()
+        _current_key.set(key)
+        data["_metrics_handler_started"] = time.perf_counter()
+
+    async def _finish_handler(self, event, results, data: dict):
+        key = data.get("_metrics_key")
+        if key is not None:
+            Metrics.handler(key).latency.record(time.perf_counter() - data["_metrics_handler_started"])
+
+    on_process_message = _start_handler
+    on_post_process_message = _finish_handler
+    on_process_callback_query = _start_handler
+    on_post_process_callback_query = _finish_handler
+
+
+async def count_error(update: types.Update, exception: Exception):
+    """errors_handler: учесть ошибку за хендлером, который её выбросил, и передать дальше."""
+    Metrics.handler(_current_key.get()).errors += 1
+    return False
+
+
+def setup(dp: Dispatcher):
+    dp.middleware.setup(MetricsMiddleware())
+    dp.register_errors_handler(count_error)
+
+
+def render_stats(prefix: str, stats: Dict[str, Any]) -> str:
+    """Словарь числовых счётчиков → gauge-метрики Prometheus."""
+    return "".join(
+        f"{prefix}_{key} {value}\n"
+        for key, value in stats.items() if isinstance(value, (int, float))
+    )
+
+
+_runner: Optional[web.AppRunner] = None
+
+
+async def start_server(host: str, port: int, *exporters):
+    """Локальный /metrics в формате Prometheus. exporters — функции, возвращающие текст."""
+    global _runner
+    if not port:
+        return
+
+    async def handle(request: web.Request) -> web.Response:
+        body = Metrics.render_prometheus() + "".join(export() for export in exporters)
+        return web.Response(text=body, content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # Порт уже занят (например, вторым воркером на том же хосте) — работаем без /metrics
+        logger.warning(f"Метрики: не удалось занять {host}:{port} ({e}), эндпоинт отключён")
+        await runner.cleanup()
+        return
+    _runner = runner
+    logger.info(f"Метрики: http://{host}:{port}/metrics")
+
+
+async def stop_server():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
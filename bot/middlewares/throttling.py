@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Защита от флуда: скользящее окно в Redis (атомарный Lua-скрипт) на пользователя
+и на команду, плюс локальный кэш «уже заблокирован до ...», чтобы повторный спам
+отбрасывался без обращения к Redis. Срабатывает до хендлера — а значит, до любых
+запросов в PostgreSQL из декораторов.
+
+Лимит объявляется при регистрации хендлера:
+
+    dp.register_message_handler(rate_limit(5, 10)(start), commands=['start'], state='*')
+"""
+
+import itertools
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from aiogram import Dispatcher, types
+from aiogram.dispatcher.handler import CancelHandler, current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from loguru import logger
+
+from bot.configs.databases import r
+
+# Общий лимит на пользователя по всем хендлерам: DEFAULT_LIMIT событий за DEFAULT_PERIOD секунд
+DEFAULT_LIMIT = int(os.getenv('THROTTLE_DEFAULT_LIMIT', 30))
+DEFAULT_PERIOD = float(os.getenv('THROTTLE_DEFAULT_PERIOD', 10))
+
+# KEYS — окна (ZSET), ARGV — пары (limit, window_ms) для каждого ключа и уникальный member.
+# Если хоть одно окно заполнено — ничего не пишем и возвращаем, сколько мс ждать.
+_SLIDING_WINDOW = r.register_script("""
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local member = ARGV[#ARGV]
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2 - 1])
+    local window = tonumber(ARGV[i * 2])
+    redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        wait = math.max(wait, tonumber(oldest[2]) + window - now)
+    end
+end
+if wait > 0 then
+    return wait
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, member)
+    redis.call('PEXPIRE', key, tonumber(ARGV[i * 2]))
+end
+return 0
+""")
+
+
+def rate_limit(limit: int, period: float = 1.0, key: Optional[str] = None):
+    """Ограничить хендлер: не больше limit вызовов за period секунд на пользователя."""
+    def decorator(func):
+        func.throttling_limit = limit
+        func.throttling_period = period
+        func.throttling_key = key
+        return func
+    return decorator
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(self, prefix: str = 'throttle'):
+        super().__init__()
+        self.prefix = prefix
+        self._member = itertools.count()
+        # (user_id, key) -> monotonic время, до которого пользователь заблокирован
+        self._blocked: Dict[Tuple[int, str], float] = {}
+        self.dropped = 0
+
+    def _locally_blocked(self, user_id: int, key: str, now: float) -> bool:
+        until = self._blocked.get((user_id, key))
+        if until is None:
+            return False
+        if until > now:
+            return True
+        del self._blocked[(user_id, key)]
+        return False
+
+    def _block(self, user_id: int, key: str, until: float, now: float):
+        if len(self._blocked) > 10000:
+            self._blocked = {k: v for k, v in self._blocked.items() if v > now}
+        self._blocked[(user_id, key)] = until
+
+    async def _check(self, user_id: int) -> Optional[float]:
+        """None — пропускаем; иначе сколько секунд осталось до разблокировки."""
+        handler = current_handler.get(None)
+        limit = getattr(handler, 'throttling_limit', None)
+        key = getattr(handler, 'throttling_key', None) or getattr(handler, '__name__', 'handler')
+        now = time.monotonic()
+
+        if self._locally_blocked(user_id, '*', now) or (limit and self._locally_blocked(user_id, key, now)):
+            return 0.0
+
+        keys = [f"{self.prefix}:{user_id}:*"]
+        args = [DEFAULT_LIMIT, int(DEFAULT_PERIOD * 1000)]
+        if limit:
+            keys.append(f"{self.prefix}:{user_id}:{key}")
+            args += [limit, int(handler.throttling_period * 1000)]
+        args.append(f"{time.time()}:{next(self._member)}")
+
+        try:
+            wait_ms = await _SLIDING_WINDOW(keys=keys, args=args)
+        except Exception as e:
+            # Redis недоступен — лучше пропустить апдейт, чем уронить бота
+            logger.error(f"Throttling недоступен: {e}")
+            return None
+        if not wait_ms:
+            return None
+
+        wait = wait_ms / 1000
+        self._block(user_id, key if limit else '*', now + wait, now)
+        return wait
+
+    async def on_process_message(self, message: types.Message, data: dict):
+        wait = await self._check(message.from_user.id)
+        if wait is None:
+            return
+        self.dropped += 1
+        if wait:  # предупреждаем только на первом отброшенном, дальше — молча
+            await message.answer(f'⏳ Слишком часто. Попробуйте через {max(1, round(wait))} с.')
+        raise CancelHandler()
+
+    async def on_process_callback_query(self, callback: types.CallbackQuery, data: dict):
+        wait = await self._check(callback.from_user.id)
+        if wait is None:
+            return
+        self.dropped += 1
+        if wait:
+            await callback.answer(f'⏳ Слишком часто. Попробуйте через {max(1, round(wait))} с.')
+        else:
+            # Без ответа у пользователя крутится индикатор загрузки, пока Telegram не сдастся
+            await callback.answer()
+        raise CancelHandler()
+
+
+def setup(dp: Dispatcher):
+    dp.middleware.setup(ThrottlingMiddleware())
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Глобальная очередь исходящих сообщений с учётом лимитов Telegram.
+- Общий лимит бота (~30 сообщений/с) и лимиты на чат: 1/с в личке, 20/мин в группах.
+- Общий лимит хранится в Redis (атомарный Lua-скрипт), поэтому он один на все процессы
+  с этим токеном — вебхук, воркеры шардированного режима. Без Redis — локальное ведро.
+- Приоритетные полосы: ответы пользователю идут раньше рассылок.
+- RetryAfter обрабатывается автоматически: на паузу ставится и чат, и общий лимит бота
+  (во всех процессах), задача — в очередь заново.
+- submit() возвращает Future, который можно await-ить, если нужен результат отправки.
+
+Лимит учитывает только то, что идёт через Outbound. Прямые вызовы (message.answer,
+callback.answer и т.п. в хендлерах) его обходят — для коротких ответов на действие
+пользователя это нормально, Telegram и сам считает их отдельно от рассылок. Всё массовое
+(рассылки, уведомления, длинные отчёты) отправляйте через Outbound.
+"""
+
+import asyncio
+import itertools
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram.utils.exceptions import RetryAfter
+from loguru import logger
+
+from bot.configs.bot import bot
+from bot.configs.databases import r
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', 30))
+PRIVATE_RATE = float(os.getenv('OUTBOUND_PRIVATE_RATE', 1))
+GROUP_RATE = float(os.getenv('OUTBOUND_GROUP_RATE_PER_MIN', 20)) / 60
+WORKERS = int(os.getenv('OUTBOUND_WORKERS', 8))
+MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', 5))
+
+# Общее ведро в Redis: HASH {tokens, updated}. ARGV — rate (в секунду), capacity и пауза в мс.
+# Пауза 0 — резервирование токена, возвращает, сколько мс ждать; иначе — пауза, как TokenBucket.pause
+_GLOBAL_BUCKET = r.register_script("""
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local rate = tonumber(ARGV[1]) / 1000
+local capacity = tonumber(ARGV[2])
+local pause = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if pause > 0 then
+    tokens = math.min(tokens, -pause * rate)
+else
+    tokens = tokens - 1
+    if tokens < 0 then
+        wait = -tokens / rate
+    end
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return math.ceil(wait)
+""")
+
+
+class TokenBucket:
+    """
+    Ведро токенов с резервированием: reserve() всегда забирает токен и
+    возвращает, сколько секунд подождать до отправки. Долг гасится со временем,
+    поэтому порядок резервирований сохраняется.
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = 0.0
+
+    def _refill(self, now: float):
+        if self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, now: float, seconds: float):
+        """Не выдавать токены ближайшие seconds секунд (повторные паузы не складываются)."""
+        self._refill(now)
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "chat_id", "call", "future", "attempts", "reserved")
+
+    def __init__(self, priority: int, seq: int, chat_id: int,
+                 call: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.call = call
+        self.future = future
+        self.attempts = 0
+        self.reserved = False
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _log_unretrieved(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"Не удалось отправить сообщение: {future.exception()!r}")
+
+
+class Outbound:
+    _queue: Optional[asyncio.PriorityQueue] = None
+    _workers: List[asyncio.Task] = []
+    _seq = itertools.count()
+    _global = TokenBucket(GLOBAL_RATE, capacity=GLOBAL_RATE)
+    _chats: Dict[int, TokenBucket] = {}
+
+    # Счётчики
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    deferred: int = 0
+    inflight: int = 0
+
+    @classmethod
+    def start(cls):
+        if cls._queue is not None:
+            return
+        cls._queue = asyncio.PriorityQueue()
+        cls._workers = [asyncio.create_task(cls._worker()) for _ in range(WORKERS)]
+
+    @classmethod
+    async def stop(cls):
+        for task in cls._workers:
+            task.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers = []
+        if cls._queue is not None:
+            while not cls._queue.empty():
+                job = cls._queue.get_nowait()
+                if not job.future.done():
+                    job.future.cancel()
+            cls._queue = None
+
+    @classmethod
+    def pending(cls) -> int:
+        """Сколько сообщений ещё не отправлено: в очереди, отложено и в процессе."""
+        queued = cls._queue.qsize() if cls._queue is not None else 0
+        return queued + cls.deferred + cls.inflight
+
+    @classmethod
+    async def drain(cls, timeout: float) -> bool:
+        """Дождаться опустошения очереди. False — если не успели за timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while cls.pending() and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        return not cls.pending()
+
+    @classmethod
+    def submit(cls, chat_id: int, call: Callable[[], Awaitable[Any]],
+               priority: int = PRIORITY_NORMAL) -> asyncio.Future:
+        """Поставить вызов Bot API в очередь. call — функция без аргументов, возвращающая корутину."""
+        cls.start()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_log_unretrieved)
+        cls._queue.put_nowait(_Job(priority, next(cls._seq), chat_id, call, future))
+        return future
+
+    @classmethod
+    def send_message(cls, chat_id: int, text: str, priority: int = PRIORITY_NORMAL, **kwargs) -> asyncio.Future:
+        return cls.submit(chat_id, lambda: bot.send_message(chat_id, text, **kwargs), priority)
+
+    @classmethod
+    def copy_message(cls, chat_id: int, from_chat_id: int, message_id: int,
+                     priority: int = PRIORITY_NORMAL, **kwargs) -> asyncio.Future:
+        return cls.submit(chat_id, lambda: bot.copy_message(chat_id, from_chat_id, message_id, **kwargs), priority)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            "queued": cls._queue.qsize() if cls._queue is not None else 0,
+            "deferred": cls.deferred,
+            "inflight": cls.inflight,
+            "sent": cls.sent,
+            "failed": cls.failed,
+            "retried": cls.retried,
+            "chat_buckets": len(cls._chats),
+        }
+
+    @classmethod
+    async def _reserve_global(cls, now: float) -> float:
+        """Токен общего лимита бота; сколько секунд подождать до отправки."""
+        try:
+            wait_ms = await _GLOBAL_BUCKET(keys=[f"outbound:{bot.id}:global"], args=[GLOBAL_RATE, GLOBAL_RATE, 0])
+        except Exception as e:
+            # Redis недоступен — держим хотя бы лимит этого процесса
+            logger.warning(f"Общий лимит в Redis недоступен: {e!r}")
+            return cls._global.reserve(now)
+        return wait_ms / 1000
+
+    @classmethod
+    async def _pause_global(cls, now: float, seconds: float):
+        cls._global.pause(now, seconds)
+        try:
+            await _GLOBAL_BUCKET(keys=[f"outbound:{bot.id}:global"],
+                                 args=[GLOBAL_RATE, GLOBAL_RATE, int(seconds * 1000)])
+        except Exception as e:
+            logger.warning(f"Не удалось поставить общий лимит на паузу: {e!r}")
+
+    @classmethod
+    def _chat_bucket(cls, chat_id: int, now: float) -> TokenBucket:
+        bucket = cls._chats.get(chat_id)
+        if bucket is None:
+            if len(cls._chats) > 10000:
+                # Полные вёдра ничего не помнят — их можно выбросить
+                cls._chats = {k: b for k, b in cls._chats.items() if not b.is_idle(now)}
+            # Отрицательный id — группа/канал, у них свой (более строгий) лимит
+            bucket = cls._chats[chat_id] = TokenBucket(GROUP_RATE if chat_id < 0 else PRIVATE_RATE)
+        return bucket
+
+    @classmethod
+    def _defer(cls, job: _Job, delay: float):
+        cls.deferred += 1
+        queue = cls._queue
+
+        def requeue():
+            cls.deferred -= 1
+            if queue is cls._queue:
+                queue.put_nowait(job)
+            elif not job.future.done():
+                job.future.cancel()
+
+        asyncio.get_running_loop().call_later(delay, requeue)
+
+    @classmethod
+    async def _worker(cls):
+        loop = asyncio.get_running_loop()
+        queue = cls._queue
+        while True:
+            job = await queue.get()
+            if job.future.done():
+                continue
+
+            # Лимит чата: вместо ожидания откладываем задачу, воркер свободен для других чатов
+            if not job.reserved:
+                job.reserved = True
+                delay = cls._chat_bucket(job.chat_id, loop.time()).reserve(loop.time())
+                if delay > 0:
+                    cls._defer(job, delay)
+                    continue
+
+            # Общий лимит бота касается всех — тут просто ждём
+            delay = await cls._reserve_global(loop.time())
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            cls.inflight += 1
+            try:
+                result = await job.call()
+            except RetryAfter as e:
+                job.attempts += 1
+                cls.retried += 1
+                if job.attempts > MAX_RETRIES:
+                    cls.failed += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                    continue
+                logger.warning(f"RetryAfter {e.timeout} с для чата {job.chat_id}")
+                cls._chat_bucket(job.chat_id, loop.time()).pause(loop.time(), e.timeout)
+                # 429 чаще всего означает общий лимит бота — притормаживаем все чаты во всех процессах
+                await cls._pause_global(loop.time(), e.timeout)
+                cls._defer(job, e.timeout)
+            except Exception as e:
+                cls.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                cls.sent += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                cls.inflight -= 1
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Фоновый сборщик системных метрик с историей в кольцевых буферах.
+- Раз в SAMPLER_INTERVAL секунд пишет лаг event loop (нужен метрикам, стоит копейки).
+- CPU, память, load average и RSS процесса (psutil) — только после первого /sysinfo
+  или сразу, если SAMPLER_SYSTEM = 1. Без этого psutil вообще не импортируется.
+- Точку отсчёта CPU процессов для топа в /sysinfo обновляем, только пока /sysinfo
+  спрашивали за последние SAMPLER_PROCESS_IDLE секунд.
+- Буферы на array('d') фиксированного размера: память постоянна, сколько бы бот ни работал.
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import time
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import psutil
+
+INTERVAL = float(os.getenv('SAMPLER_INTERVAL', 5))
+# Как часто обновлять точку отсчёта CPU процессов для топа в /sysinfo (0 — не обновлять)
+PROCESS_INTERVAL = float(os.getenv('SAMPLER_PROCESS_INTERVAL', 60))
+HISTORY_SECONDS = float(os.getenv('SAMPLER_HISTORY', 3600))
+# Собирать системные метрики с запуска, а не с первого /sysinfo
+SYSTEM_ON_START = os.getenv('SAMPLER_SYSTEM', '0') not in ('', '0')
+# Сколько секунд после последнего /sysinfo продолжать обход процессов
+PROCESS_IDLE = float(os.getenv('SAMPLER_PROCESS_IDLE', 600))
+
+
+class RingBuffer:
+    """Кольцевой буфер значений с отметками времени (time.monotonic())."""
+    __slots__ = ("_values", "_times", "_size", "_pos", "_count")
+
+    def __init__(self, size: int):
+        self._values = array("d", bytes(8 * size))
+        self._times = array("d", bytes(8 * size))
+        self._size = size
+        self._pos = 0
+        self._count = 0
+
+    def append(self, value: float, ts: Optional[float] = None):
+        self._values[self._pos] = value
+        self._times[self._pos] = time.monotonic() if ts is None else ts
+        self._pos = (self._pos + 1) % self._size
+        if self._count < self._size:
+            self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def last(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._values[(self._pos - 1) % self._size]
+
+    def values(self, window: Optional[float] = None) -> List[float]:
+        """Значения от старых к новым, опционально только за последние window секунд."""
+        start = (self._pos - self._count) % self._size
+        since = time.monotonic() - window if window is not None else None
+        res = []
+        for i in range(self._count):
+            j = (start + i) % self._size
+            if since is None or self._times[j] >= since:
+                res.append(self._values[j])
+        return res
+
+    def stats(self, window: Optional[float] = None) -> Optional[Dict[str, float]]:
+        vals = self.values(window)
+        if not vals:
+            return None
+        # Тренд: среднее последней четверти окна против первой
+        q = max(1, len(vals) // 4)
+        return {
+            "min": min(vals),
+            "avg": sum(vals) / len(vals),
+            "max": max(vals),
+            "last": vals[-1],
+            "trend": sum(vals[-q:]) / q - sum(vals[:q]) / q,
+            "samples": len(vals),
+        }
+
+
+class SystemSampler:
+    interval: float = INTERVAL
+    history: float = HISTORY_SECONDS
+    size: int = max(1, int(HISTORY_SECONDS // INTERVAL))
+
+    cpu = RingBuffer(size)            # % CPU системы
+    memory = RingBuffer(size)         # % занятой RAM
+    load1 = RingBuffer(size)          # load average за 1 минуту
+    loop_lag = RingBuffer(size)       # задержка event loop, секунды
+    rss = RingBuffer(size)            # RSS процесса бота, байты
+
+    _task: Optional[asyncio.Task] = None
+    _process: Optional[psutil.Process] = None
+    # loop.time() последнего /sysinfo — пока он свежий, обходим процессы
+    _processes_requested: Optional[float] = None
+
+    @classmethod
+    def start(cls):
+        if cls._task is None:
+            if SYSTEM_ON_START:
+                cls.enable_system()
+            cls._task = asyncio.create_task(cls._loop())
+
+    @classmethod
+    def enable_system(cls):
+        """Начать собирать CPU/память/RSS. Вызывается из /sysinfo — psutil грузим только тогда."""
+        if cls._process is None:
+            import psutil
+
+            cls._process = psutil.Process()
+            psutil.cpu_percent(None)  # первый вызов только запоминает точку отсчёта
+
+    @classmethod
+    def watch_processes(cls):
+        """/sysinfo показывает топ процессов — поддерживать точку отсчёта ещё PROCESS_IDLE секунд."""
+        cls.enable_system()
+        cls._processes_requested = asyncio.get_running_loop().time()
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            await asyncio.gather(cls._task, return_exceptions=True)
+            cls._task = None
+
+    @classmethod
+    def sample(cls, lag: float):
+        now = time.monotonic()
+        cls.loop_lag.append(lag, now)
+        if cls._process is None:
+            return
+        import psutil
+
+        try:
+            cls.cpu.append(psutil.cpu_percent(None), now)
+            cls.memory.append(psutil.virtual_memory().percent, now)
+            cls.rss.append(cls._process.memory_info().rss, now)
+            if hasattr(os, "getloadavg"):
+                cls.load1.append(os.getloadavg()[0], now)
+        except Exception:
+            pass
+
+    @classmethod
+    def summary(cls, window: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "interval": cls.interval,
+            "window": window or cls.history,
+            "cpu": cls.cpu.stats(window),
+            "memory": cls.memory.stats(window),
+            "load1": cls.load1.stats(window),
+            "loop_lag": cls.loop_lag.stats(window),
+            "rss": cls.rss.stats(window),
+        }
+
+    @classmethod
+    async def _loop(cls):
+        loop = asyncio.get_running_loop()
+        next_processes = loop.time()
+        while True:
+            expected = loop.time() + cls.interval
+            await asyncio.sleep(cls.interval)
+            # Насколько позже запланированного нас разбудили — это и есть лаг loop
+            cls.sample(max(0.0, loop.time() - expected))
+
+            watched = (cls._processes_requested is not None
+                       and loop.time() - cls._processes_requested < PROCESS_IDLE)
+            if PROCESS_INTERVAL and watched and loop.time() >= next_processes:
+                next_processes = loop.time() + PROCESS_INTERVAL
+                # Проход по процессам тяжёлый — в потоке sysinfo, не в event loop
+                try:
+                    from bot.other import sysinfo
+
+                    await loop.run_in_executor(sysinfo._executor, sysinfo.read_process_times)
+                except Exception:
+                    pass
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Замер холодного старта по фазам.
+Фазы могут идти параллельно, поэтому в отчёте и длительность каждой, и общее время.
+Итог пишется в лог одной строкой и отдаётся на /metrics (bot_startup_*).
+"""
+
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Dict, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class StartupReport:
+    _started: float = time.perf_counter()
+    phases: Dict[str, float] = {}
+    total: float = 0.0
+
+    @classmethod
+    def begin(cls):
+        cls._started = time.perf_counter()
+        cls.phases = {}
+        cls.total = 0.0
+
+    @classmethod
+    @asynccontextmanager
+    async def phase(cls, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.phases[name] = time.perf_counter() - started
+
+    @classmethod
+    async def timed(cls, name: str, aw: Awaitable[T]) -> T:
+        async with cls.phase(name):
+            return await aw
+
+    @classmethod
+    def finish(cls):
+        cls.total = time.perf_counter() - cls._started
+        breakdown = ", ".join(f"{name} {seconds * 1000:.0f} мс" for name, seconds in cls.phases.items())
+        logger.info(f"Запуск за {cls.total * 1000:.0f} мс: {breakdown}")
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        return {"total_seconds": cls.total, **{f"{name}_seconds": s for name, s in cls.phases.items()}}
@@ -7,6 +7,8 @@
 """
 
 from __future__ import annotations
+import asyncio
+import heapq
 import json
 import os
 import platform
@@ -16,10 +18,29 @@ import socket
 import subprocess
 import sys
 import time
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import psutil
 
+# Публичный IP меняется редко — держим его долго, неудачу кэшируем ненадолго
+PUBLIC_IP_TTL = 3600.0
+PUBLIC_IP_FAIL_TTL = 60.0
+# Готовый снимок отдаём повторно, если он свежее этого
+SNAPSHOT_TTL = 5.0
+
+# Топ процессов: сколько показывать и только ли дерево процессов бота
+PROCESS_TOP_N = int(os.getenv("SYSINFO_TOP_N", 5))
+PROCESS_OWN_TREE_ONLY = os.getenv("SYSINFO_OWN_TREE_ONLY", "0").lower() in ("1", "true", "yes")
+
+_public_ip_cache: Tuple[Optional[str], float] = (None, 0.0)
+# Предыдущее чтение процессов: pid -> (create_time, cpu_seconds, monotonic)
+_proc_prev: Dict[int, Tuple[float, float, float]] = {}
+_snapshot_cache: Dict[bool, Tuple[float, Dict[str, Any]]] = {}
+_snapshot_lock = asyncio.Lock()
+# Отдельный поток, чтобы сбор (со sleep и сетевыми запросами) не блокировал event loop
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sysinfo")
+
 def _bytes_to_human(n: int | None) -> str:
     """Перевод байт в человеко-читаемый формат."""
     try:
@@ -242,10 +263,81 @@ def _get_public_ip(timeout: float = 2.5) -> Optional[str]:
     return None
 
 
-def get_system_info(include_processes: bool = False) -> Dict[str, Any]:
+def _own_tree_pids() -> Set[int]:
+    me = psutil.Process()
+    return {me.pid} | {c.pid for c in me.children(recursive=True)}
+
+
+def read_process_times(only_own_tree: bool = PROCESS_OWN_TREE_ONLY) -> List[Dict[str, Any]]:
+    """
+    Один проход по таблице процессов (каждый процесс читается внутри oneshot()).
+    CPU% считается по разнице cpu_times с предыдущим чтением; если его нет —
+    среднее за время жизни процесса. Текущее чтение становится новой точкой отсчёта.
+    """
+    global _proc_prev
+    allowed = _own_tree_pids() if only_own_tree else None
+    now = time.monotonic()
+    wall = time.time()
+    current: Dict[int, Tuple[float, float, float]] = {}
+    rows: List[Dict[str, Any]] = []
+
+    for p in psutil.process_iter():
+        if allowed is not None and p.pid not in allowed:
+            continue
+        try:
+            with p.oneshot():
+                created = p.create_time()
+                ct = p.cpu_times()
+                cpu_total = ct.user + ct.system
+                rss = p.memory_info().rss
+                name = p.name()
+                user = _safe(p.username, None)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+
+        prev = _proc_prev.get(p.pid)
+        if prev and prev[0] == created and now > prev[2]:
+            cpu_percent = (cpu_total - prev[1]) / (now - prev[2]) * 100
+        else:
+            cpu_percent = cpu_total / max(wall - created, 1e-6) * 100
+        current[p.pid] = (created, cpu_total, now)
+        rows.append({"pid": p.pid, "name": name, "user": user, "rss": rss, "cpu_percent": cpu_percent})
+
+    # Заменяем целиком — записи умерших процессов не копятся
+    if allowed is None:
+        _proc_prev = current
+    else:
+        _proc_prev.update(current)
+    return rows
+
+
+def _top_processes(n: int = PROCESS_TOP_N, only_own_tree: bool = PROCESS_OWN_TREE_ONLY) -> Dict[str, Any]:
+    rows = read_process_times(only_own_tree)
+    return {
+        "top_memory": heapq.nlargest(n, rows, key=lambda x: x["rss"] or 0),
+        "top_cpu": heapq.nlargest(n, rows, key=lambda x: x["cpu_percent"] or 0),
+    }
+
+
+def _get_public_ip_cached() -> Optional[str]:
+    global _public_ip_cache
+    ip, expires_at = _public_ip_cache
+    now = time.monotonic()
+    if now < expires_at:
+        return ip
+    ip = _get_public_ip()
+    _public_ip_cache = (ip, now + (PUBLIC_IP_TTL if ip else PUBLIC_IP_FAIL_TTL))
+    return ip
+
+
+def get_system_info(include_processes: bool = False,
+                    top_n: int = PROCESS_TOP_N,
+                    only_own_tree: bool = PROCESS_OWN_TREE_ONLY) -> Dict[str, Any]:
     """
     Возвращает словарь с системной информацией и IP-адресами.
     :param include_processes: если True и установлен psutil — добавит топ-процессы по памяти/CPU.
+    :param top_n: сколько процессов показывать в каждом топе.
+    :param only_own_tree: учитывать только процесс бота и его потомков.
     """
     info: Dict[str, Any] = {
         "timestamp": int(time.time()),
@@ -256,54 +348,40 @@ def get_system_info(include_processes: bool = False) -> Dict[str, Any]:
         "memory": _get_memory_info(),
         "disk": _get_disk_info(),
         "network": _get_all_local_ips(),
-        "public_ip": _get_public_ip(),
+        "public_ip": _get_public_ip_cached(),
     }
 
     if include_processes and psutil:
-        # ТОП по памяти и CPU (по 5 штук), безопасно
-        def top_by_memory(n=5):
-            res = []
-            for p in psutil.process_iter(attrs=["pid", "name", "username", "memory_info", "cpu_percent"]):
-                try:
-                    mi = p.info.get("memory_info")
-                    res.append({
-                        "pid": p.info.get("pid"),
-                        "name": p.info.get("name"),
-                        "user": p.info.get("username"),
-                        "rss": getattr(mi, "rss", None) if mi else None,
-                        "cpu_percent": p.info.get("cpu_percent"),
-                    })
-                except Exception:
-                    continue
-            res.sort(key=lambda x: (x["rss"] or 0), reverse=True)
-            return res[:n]
-
-        def top_by_cpu(n=5):
-            # Небольшой прогрев для корректных процентов
-            for p in psutil.process_iter():
-                _ = _safe(lambda p=p: p.cpu_percent(None), 0)
-            time.sleep(0.2)
-            res = []
-            for p in psutil.process_iter(attrs=["pid", "name", "username"]):
-                try:
-                    res.append({
-                        "pid": p.info.get("pid"),
-                        "name": p.info.get("name"),
-                        "user": p.info.get("username"),
-                        "cpu_percent": p.cpu_percent(None),
-                    })
-                except Exception:
-                    continue
-            res.sort(key=lambda x: (x["cpu_percent"] or 0), reverse=True)
-            return res[:n]
-
-        info["processes"] = {
-            "top_memory": _safe(lambda: top_by_memory(5), []),
-            "top_cpu": _safe(lambda: top_by_cpu(5), []),
-        }
+        info["processes"] = _safe(lambda: _top_processes(top_n, only_own_tree), {})
 
     return info
 
+async def get_system_info_async(include_processes: bool = False) -> Dict[str, Any]:
+    """
+    Асинхронная обёртка над get_system_info(): сбор идёт в отдельном потоке,
+    результат кэшируется на SNAPSHOT_TTL секунд. Снимок с процессами подходит и для запроса без них.
+    """
+    def fresh(key: bool) -> Optional[Dict[str, Any]]:
+        cached = _snapshot_cache.get(key)
+        if cached and time.monotonic() - cached[0] < SNAPSHOT_TTL:
+            return cached[1]
+        return None
+
+    info = fresh(True) or (None if include_processes else fresh(False))
+    if info is not None:
+        return info
+
+    async with _snapshot_lock:
+        # Пока ждали блокировку, снимок мог собрать другой запрос
+        info = fresh(True) or (None if include_processes else fresh(False))
+        if info is not None:
+            return info
+        loop = asyncio.get_running_loop()
+        info = await loop.run_in_executor(_executor, get_system_info, include_processes)
+        _snapshot_cache[include_processes] = (time.monotonic(), info)
+        return info
+
+
 def _fmt_info(info: Dict[str, Any]) -> str:
     """Собрать красивый HTML из словаря get_system_info()."""
     try:
@@ -397,19 +475,41 @@ def _fmt_info(info: Dict[str, Any]) -> str:
             parts.append("\n📊 <b>Процессы</b>\n")
         if top_mem:
             parts.append("• <b>Топ по памяти:</b>\n")
-            for p in top_mem[:5]:
+            for p in top_mem:
                 parts.append(
                     f"  — <code>{p.get('pid')}</code> {p.get('name','?')} "
                     f"({p.get('user','?')}), RSS={_bytes_to_human(p.get('rss'))}, CPU={_percent(p.get('cpu_percent'))}\n"
                 )
         if top_cpu:
             parts.append("• <b>Топ по CPU:</b>\n")
-            for p in top_cpu[:5]:
+            for p in top_cpu:
                 parts.append(
                     f"  — <code>{p.get('pid')}</code> {p.get('name','?')} "
                     f"({p.get('user','?')}), CPU={_percent(p.get('cpu_percent'))}\n"
                 )
 
+        # История из фонового сборщика (если запущен)
+        hist = info.get("history") or {}
+        rows = [
+            ("CPU", "cpu", _percent),
+            ("RAM", "memory", _percent),
+            ("Load1", "load1", lambda v: f"{v:.2f}"),
+            ("Лаг loop", "loop_lag", lambda v: f"{v * 1000:.1f} мс"),
+            ("RSS", "rss", _bytes_to_human),
+        ]
+        if any(hist.get(key) for _, key, _ in rows):
+            minutes = int((hist.get("window") or 0) // 60)
+            parts.append(f"\n📈 <b>История за {minutes} мин</b> (min / avg / max)\n")
+            for title, key, fmt in rows:
+                st = hist.get(key)
+                if not st:
+                    continue
+                eps = abs(st["avg"]) * 0.05
+                arrow = "↗" if st["trend"] > eps else ("↘" if st["trend"] < -eps else "→")
+                parts.append(
+                    f"• <b>{title}:</b> {fmt(st['min'])} / {fmt(st['avg'])} / {fmt(st['max'])} {arrow}\n"
+                )
+
         return "".join(parts).strip()
     except Exception:
         # На всякий случай отдаём JSON как есть
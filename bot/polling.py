@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Long polling своим циклом вместо executor.start_polling.
+Задача цикла и задачи обработки пачек принадлежат нам, поэтому при остановке
+их можно дождаться (с дедлайном), не заглядывая во внутренности Dispatcher,
+а offset подтверждается в Telegram — после рестарта последняя пачка не придёт снова.
+"""
+
+import asyncio
+import signal
+from typing import Awaitable, Callable, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from loguru import logger
+
+TIMEOUT = 20
+
+
+class Poller:
+    _dp: Optional[Dispatcher] = None
+    _task: Optional[asyncio.Task] = None
+    _batches: Set[asyncio.Task] = set()
+    _stopped = False
+    offset: Optional[int] = None
+
+    @classmethod
+    async def start(cls, dp: Dispatcher, skip_updates: bool = False):
+        if cls._task is not None:
+            return
+        cls._dp = dp
+        if skip_updates:
+            await dp.skip_updates()
+        else:
+            await dp.bot.delete_webhook()
+        cls._stopped = False
+        cls._task = asyncio.create_task(cls._loop())
+        logger.info("Polling запущен")
+
+    @classmethod
+    async def stop(cls, deadline: float) -> int:
+        """
+        Остановить polling и дождаться уже полученных апдейтов до deadline (loop.time()).
+        Возвращает, сколько пачек не успели обработать.
+        """
+        if cls._task is None:
+            return 0
+        cls._stopped = True
+        loop = asyncio.get_running_loop()
+
+        # Текущий getUpdates либо вернёт пачку (её обработка попадёт в _batches), либо будет прерван:
+        # неподтверждённые апдейты Telegram отдаст снова
+        done, _ = await asyncio.wait({cls._task}, timeout=max(0.0, deadline - loop.time()))
+        if not done:
+            cls._task.cancel()
+        await asyncio.gather(cls._task, return_exceptions=True)
+        cls._task = None
+
+        pending = set()
+        if cls._batches:
+            _, pending = await asyncio.wait(set(cls._batches), timeout=max(0.0, deadline - loop.time()))
+        await cls._confirm()
+        return len(pending)
+
+    @classmethod
+    async def _confirm(cls):
+        """Сообщить Telegram offset: иначе после рестарта он отдаст последнюю пачку ещё раз."""
+        if cls.offset is None:
+            return
+        try:
+            await cls._dp.bot.get_updates(offset=cls.offset, limit=1, timeout=0)
+        except Exception as e:
+            logger.warning(f"Не удалось подтвердить offset {cls.offset}: {e}")
+
+    @classmethod
+    async def _loop(cls):
+        dp = cls._dp
+        Bot.set_current(dp.bot)
+        Dispatcher.set_current(dp)
+        while not cls._stopped:
+            try:
+                updates = await dp.bot.get_updates(offset=cls.offset, timeout=TIMEOUT)
+            except Exception as e:
+                logger.error(f"getUpdates: {e}")
+                await asyncio.sleep(5)
+                continue
+            if not updates:
+                continue
+            cls.offset = updates[-1].update_id + 1
+            # Пачка обрабатывается отдельной задачей — следующий getUpdates не ждёт хендлеров
+            task = asyncio.create_task(cls._process(updates))
+            cls._batches.add(task)
+            task.add_done_callback(cls._batches.discard)
+
+    @classmethod
+    async def _process(cls, updates):
+        try:
+            await cls._dp.process_updates(updates)
+        except Exception as e:
+            logger.exception(f"Ошибка обработки апдейтов: {e}")
+
+
+def start_polling(dp: Dispatcher, skip_updates: bool = False,
+                  on_startup: Optional[Callable[[Dispatcher], Awaitable]] = None,
+                  on_shutdown: Optional[Callable[[Dispatcher], Awaitable]] = None):
+    """Запустить бота в режиме polling. SIGINT/SIGTERM — мягкая остановка через on_shutdown."""
+    loop = asyncio.get_event_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    async def main():
+        if on_startup:
+            await on_startup(dp)
+        try:
+            await Poller.start(dp, skip_updates=skip_updates)
+            await stop.wait()
+        finally:
+            if on_shutdown:
+                await on_shutdown(dp)
+
+    try:
+        loop.run_until_complete(main())
+    except KeyboardInterrupt:  # Windows: сигналы через add_signal_handler не работают
+        pass
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Горизонтальное масштабирование: один ingress-процесс и N воркеров.
+- Ingress (polling или webhook) кладёт апдейты в Redis Streams, партиция = hash(user_id) % SHARD_PARTITIONS.
+  Повторы отсекаются по update_id (как в webhook), а при остановке polling-ingress
+  подтверждает offset в Telegram — после рестарта последняя пачка не придёт снова.
+- Воркер держит аренду (lease) на часть партиций и читает их через consumer group.
+  Каждую партицию читает ровно один воркер и обрабатывает её последовательно —
+  так сохраняется порядок апдейтов одного пользователя.
+- Воркеры регистрируются по heartbeat и делят партиции поровну. Ушедший воркер
+  теряет аренду по TTL, новый владелец забирает его неподтверждённые (pending) записи
+  через XAUTOCLAIM и обрабатывает их первыми — апдейты не теряются.
+"""
+
+import asyncio
+import json
+import math
+import signal
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from aiogram import Bot, Dispatcher, types
+from loguru import logger
+from redis.exceptions import ResponseError
+
+from bot.configs.databases import r
+from bot.configs.sharding import sharding
+from bot.databases.redis import acquire_lease, release_lease, renew_lease
+from bot.webhook import mark_seen, unmark_seen
+
+WORKERS_KEY = 'shard:workers'
+
+# Поля апдейта, в которых лежит объект с отправителем
+_USER_PATHS = ('from', 'user', 'chat')
+
+
+def _stream(partition: int) -> str:
+    return f"{sharding.stream_prefix}:{partition}"
+
+
+def _lease(partition: int) -> str:
+    return f"shard:lease:{partition}"
+
+
+def user_of(data: Dict[str, Any]) -> int:
+    """user_id отправителя апдейта (0, если определить нельзя)."""
+    for key, obj in data.items():
+        if key == 'update_id' or not isinstance(obj, dict):
+            continue
+        for path in _USER_PATHS:
+            inner = obj.get(path)
+            if isinstance(inner, dict) and 'id' in inner:
+                return inner['id']
+    return 0
+
+
+def partition_of(user_id: int) -> int:
+    return zlib.crc32(str(user_id).encode()) % sharding.partitions
+
+
+async def push(data: Dict[str, Any]):
+    """Положить сырой апдейт в партицию его пользователя."""
+    await r.xadd(
+        _stream(partition_of(user_of(data))),
+        {'u': json.dumps(data, ensure_ascii=False)},
+        maxlen=sharding.stream_maxlen,
+        approximate=True
+    )
+
+
+class ShardIngress:
+    """Ingress в режиме long polling: getUpdates → Redis Streams."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.offset: Optional[int] = None
+        self._stopped = False
+
+    async def run(self):
+        await self.bot.delete_webhook()
+        logger.info(f"Ingress запущен, партиций: {sharding.partitions}")
+        while not self._stopped:
+            try:
+                updates = await self.bot.get_updates(offset=self.offset, timeout=20)
+            except Exception as e:
+                logger.error(f"getUpdates: {e}")
+                await asyncio.sleep(5)
+                continue
+            try:
+                for update in updates:
+                    # offset двигаем только после успешной записи — при сбое Telegram отдаст апдейт снова
+                    if await mark_seen(update.update_id):
+                        try:
+                            await push(update.to_python())
+                        except Exception:
+                            await unmark_seen(update.update_id)
+                            raise
+                    self.offset = update.update_id + 1
+            except Exception as e:
+                logger.error(f"Не удалось записать апдейт в поток: {e}")
+                await asyncio.sleep(1)
+        await self._confirm()
+
+    async def _confirm(self):
+        """Сообщить Telegram offset: иначе после рестарта он отдаст последнюю пачку ещё раз."""
+        if self.offset is None:
+            return
+        try:
+            await self.bot.get_updates(offset=self.offset, limit=1, timeout=0)
+        except Exception as e:
+            logger.warning(f"Не удалось подтвердить offset {self.offset}: {e}")
+
+    def stop(self):
+        self._stopped = True
+
+
+class ShardWorker:
+    def __init__(self, dp: Dispatcher):
+        self.dp = dp
+        self.consumer = sharding.consumer
+        self.owned: Dict[int, asyncio.Task] = {}
+        # Партиции, которые сейчас обрабатывают запись / которые надо остановить после неё
+        self._busy: Set[int] = set()
+        self._stopping: Set[int] = set()
+        self._stopped = asyncio.Event()
+        self.processed = 0
+
+    @property
+    def _lease_ms(self) -> int:
+        return int(sharding.lease_ttl * 1000)
+
+    async def run(self):
+        logger.info(f"Воркер {self.consumer} запущен")
+        try:
+            while not self._stopped.is_set():
+                try:
+                    await self._rebalance()
+                except Exception as e:
+                    logger.error(f"Ребалансировка: {e}")
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), timeout=sharding.lease_ttl / 3)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await asyncio.gather(*(self._release(p) for p in list(self.owned)))
+            await r.zrem(WORKERS_KEY, self.consumer)
+
+    def stop(self):
+        self._stopped.set()
+
+    async def _rebalance(self):
+        now = time.time()
+        await r.zadd(WORKERS_KEY, {self.consumer: now})
+        await r.zremrangebyscore(WORKERS_KEY, 0, now - sharding.lease_ttl)
+        active = max(1, await r.zcard(WORKERS_KEY))
+        target = math.ceil(sharding.partitions / active)
+
+        # Продлеваем свои аренды; потерянные — останавливаем
+        release = []
+        for partition in list(self.owned):
+            task = self.owned[partition]
+            if task.done() or not await renew_lease(_lease(partition), self.consumer, self._lease_ms):
+                logger.warning(f"Партиция {partition} потеряна")
+                release.append(partition)
+
+        # Лишние отдаём — их подхватят новые воркеры
+        keep = sorted(p for p in self.owned if p not in release)
+        release += keep[target:]
+        await asyncio.gather(*(self._release(p) for p in release))
+
+        # Добираем свободные
+        for partition in range(sharding.partitions):
+            if len(self.owned) >= target:
+                break
+            if partition in self.owned:
+                continue
+            if await acquire_lease(_lease(partition), self.consumer, self._lease_ms):
+                self.owned[partition] = asyncio.create_task(self._consume(partition))
+                logger.info(f"Взяли партицию {partition}")
+
+    async def _release(self, partition: int):
+        task = self.owned.pop(partition, None)
+        if task is not None:
+            self._stopping.add(partition)
+            if partition in self._busy:
+                # Хендлер уже работает: даём ему закончить и подтвердить запись,
+                # иначе новый владелец заберёт её через XAUTOCLAIM и выполнит повторно
+                done, _ = await asyncio.wait({task}, timeout=sharding.lease_ttl / 2)
+                if not done:
+                    logger.warning(f"Партиция {partition}: апдейт не успел обработаться, прерываем")
+            # Ожидание XREADGROUP прерывать безопасно: недоставленные записи заберёт новый владелец
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self._stopping.discard(partition)
+        await release_lease(_lease(partition), self.consumer)
+
+    async def _consume(self, partition: int):
+        stream = _stream(partition)
+        try:
+            await r.xgroup_create(stream, sharding.group, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+        Bot.set_current(self.dp.bot)
+        Dispatcher.set_current(self.dp)
+
+        # Сначала то, что прежний владелец прочитал, но не подтвердил
+        start = '0-0'
+        while partition not in self._stopping:
+            start, entries, *_ = await r.xautoclaim(
+                stream, sharding.group, self.consumer, min_idle_time=0,
+                start_id=start, count=sharding.batch
+            )
+            await self._process(partition, stream, entries)
+            if start == '0-0':
+                break
+
+        while partition not in self._stopping:
+            response = await r.xreadgroup(
+                sharding.group, self.consumer, {stream: '>'},
+                count=sharding.batch, block=2000
+            )
+            for _, entries in response or []:
+                await self._process(partition, stream, entries)
+
+    async def _process(self, partition: int, stream: str, entries):
+        # Строго по одному: порядок внутри партиции = порядок для пользователя
+        for entry_id, fields in entries:
+            # Остаток пачки не трогаем — он останется в pending и достанется новому владельцу
+            if partition in self._stopping:
+                return
+            self._busy.add(partition)
+            try:
+                if fields:
+                    try:
+                        await self.dp.process_updates([types.Update(**json.loads(fields['u']))])
+                    except Exception as e:
+                        logger.exception(f"Ошибка обработки апдейта {entry_id}: {e}")
+                await r.xack(stream, sharding.group, entry_id)
+                self.processed += 1
+            finally:
+                self._busy.discard(partition)
+
+
+def _run(main: Callable[[], Awaitable], stop: Callable[[], None]):
+    loop = asyncio.get_event_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop)
+        except NotImplementedError:  # Windows
+            pass
+    loop.run_until_complete(main())
+
+
+async def _close_bot(dp: Dispatcher):
+    session = await dp.bot.get_session()
+    await session.close()
+
+
+def start_ingress(dp: Dispatcher):
+    if sharding.ingress == 'webhook':
+        from bot.webhook import WebhookServer
+
+        async def on_shutdown(dp, deadline=None):
+            await _close_bot(dp)
+            await r.aclose()
+
+        WebhookServer(dp, on_shutdown=on_shutdown, sink=push).run()
+        return
+
+    ingress = ShardIngress(dp.bot)
+
+    async def main():
+        try:
+            await ingress.run()
+        finally:
+            await _close_bot(dp)
+            await r.aclose()
+
+    _run(main, ingress.stop)
+
+
+def start_worker(dp: Dispatcher, on_startup=None, on_shutdown=None):
+    worker = ShardWorker(dp)
+
+    async def main():
+        if on_startup:
+            await on_startup(dp)
+        try:
+            await worker.run()
+        finally:
+            if on_shutdown:
+                await on_shutdown(dp)
+
+    _run(main, worker.stop)
@@ -1,5 +1,8 @@
+import re
+import time
+from collections import OrderedDict
 from aiogram.types import Message, CallbackQuery
-from typing import List, Union
+from typing import Any, Hashable, List, Optional, Tuple, Union
 
 
 def _get_sender(message_or_callback: Union[Message, CallbackQuery]) -> Message:
@@ -8,20 +11,162 @@ def _get_sender(message_or_callback: Union[Message, CallbackQuery]) -> Message:
         return message_or_callback.message
     return message_or_callback
 
-def _chunk(text: str, limit: int = 3800) -> List[str]:
+_HTML_TOKEN = re.compile(r"<[^<>]*>|&#?\w+;|[^<&]+|[<&]")
+_TAG_NAME = re.compile(r"<(/?)([a-zA-Z][\w-]*)")
+
+
+def _utf16_len(text: str) -> int:
+    """Длина в единицах UTF-16 — именно так Telegram считает лимиты."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _utf16_prefix(text: str, budget: int) -> int:
+    """Сколько символов из начала text помещается в budget единиц UTF-16."""
+    n = min(len(text), budget)
+    if _utf16_len(text[:n]) <= budget:
+        return n
+    used = 0
+    for i, ch in enumerate(text):
+        used += 2 if ord(ch) > 0xFFFF else 1
+        if used > budget:
+            return i
+    return len(text)
+
+
+def _split_point(text: str, cut: int) -> int:
+    """Где резать text не дальше cut: после перевода строки, иначе после пробела; 0 — негде."""
+    if cut >= len(text):
+        return cut
+    for sep in ("\n", " "):
+        i = text.rfind(sep, 0, cut)
+        if i >= 0:
+            return i + 1
+    return 0
+
+
+def _chunk(text: str, limit: int = 4096) -> List[str]:
     """
-    Порезать длинный текст на части с запасом под HTML.
-    Telegram лимит ~4096, оставляем запас под теги и эмодзи.
+    Порезать HTML-текст на части не длиннее limit единиц UTF-16.
+    Режет по переводам строк, затем по пробелам, слишком длинные строки — посимвольно.
+    Теги и сущности (&amp; и т.п.) не разрываются; открытые теги закрываются
+    в конце части и открываются заново в следующей. Работает за линейное время.
     """
-    res, cur = [], []
-    cur_len = 0
-    for line in text.splitlines(keepends=True):
-        if cur_len + len(line) > limit:
-            res.append("".join(cur))
-            cur, cur_len = [line], len(line)
-        else:
-            cur.append(line)
-            cur_len += len(line)
-    if cur:
-        res.append("".join(cur))
-    return res
\ No newline at end of file
+    res: List[str] = []
+    stack: List[Tuple[str, str, str]] = []  # (имя, открывающий тег, закрывающий тег)
+    parts: List[str] = []
+    size = 0        # длина текущей части без хвоста закрывающих тегов
+    closing = 0     # длина этого хвоста
+    has_text = False
+
+    def flush():
+        nonlocal parts, size, has_text
+        if has_text:
+            res.append("".join(parts) + "".join(close for _, _, close in reversed(stack)))
+        reopen = "".join(open_ for _, open_, _ in stack)
+        parts, size, has_text = [reopen], _utf16_len(reopen), False
+
+    for match in _HTML_TOKEN.finditer(text):
+        token = match.group()
+        tag = _TAG_NAME.match(token) if token[0] == "<" and len(token) > 1 else None
+
+        if tag and tag.group(1):
+            # Закрывающий тег: место под него уже зарезервировано в closing
+            name = tag.group(2).lower()
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == name:
+                    closing -= _utf16_len(stack.pop(i)[2])
+                    break
+            parts.append(token)
+            size += _utf16_len(token)
+            continue
+
+        if tag and not token.endswith("/>"):
+            name = tag.group(2).lower()
+            close = f"</{name}>"
+            cost = _utf16_len(token) + _utf16_len(close)
+            if has_text and size + closing + cost > limit:
+                flush()
+            stack.append((name, token, close))
+            parts.append(token)
+            size += _utf16_len(token)
+            closing += _utf16_len(close)
+            continue
+
+        if tag or token[0] == "&" and len(token) > 1:
+            # Неделимые куски: самозакрывающиеся теги и сущности
+            cost = _utf16_len(token)
+            if has_text and size + closing + cost > limit:
+                flush()
+            parts.append(token)
+            size += cost
+            has_text = True
+            continue
+
+        while token:
+            room = max(limit - size - closing, 0)
+            cut = _utf16_prefix(token, room)
+            if cut == len(token):
+                parts.append(token)
+                size += _utf16_len(token)
+                has_text = has_text or not token.isspace()
+                break
+            point = _split_point(token, cut)
+            if not point:
+                if has_text:
+                    # Сначала попробуем уместить кусок целиком в новой части
+                    flush()
+                    continue
+                point = max(cut, 1)
+            piece, token = token[:point], token[point:]
+            parts.append(piece)
+            size += _utf16_len(piece)
+            has_text = has_text or not piece.isspace()
+            flush()
+
+    flush()
+    return res
+
+class TTLCache:
+    """
+    Простой LRU-кэш с ограничением по размеру и времени жизни записей.
+    Не потокобезопасен — рассчитан на использование внутри одного event loop.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return item[0] if item is not None else default
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
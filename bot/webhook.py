@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Режим webhook на aiohttp — альтернатива long polling.
+- Telegram получает 200 сразу, апдейт обрабатывается пулом воркеров из ограниченной очереди.
+- Повторы от Telegram отсекаются по update_id через Redis (SET NX с TTL).
+- Если очередь переполнена, отвечаем 503 — Telegram пришлёт апдейт ещё раз.
+- Вместо локальной обработки апдейты можно отдавать в sink (см. bot/sharding.py).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher, types
+from loguru import logger
+
+from bot.configs.databases import r
+from bot.configs.webhook import webhook
+
+SEEN_PREFIX = 'webhook:seen:'
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+async def mark_seen(update_id: int) -> bool:
+    """True — апдейт новый; False — уже приходил."""
+    return bool(await r.set(f"{SEEN_PREFIX}{update_id}", 1, nx=True, ex=webhook.dedup_ttl))
+
+
+async def unmark_seen(update_id: int):
+    """Апдейт не приняли — пусть повтор от Telegram не считается дублем."""
+    await r.delete(f"{SEEN_PREFIX}{update_id}")
+
+
+class WebhookServer:
+    def __init__(self, dp: Dispatcher,
+                 on_startup: Optional[Callable[[Dispatcher], Awaitable]] = None,
+                 on_shutdown: Optional[Callable[[Dispatcher, float], Awaitable]] = None,
+                 sink: Optional[Callable[[Dict[str, Any]], Awaitable]] = None):
+        self.dp = dp
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+        self.sink = sink
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=webhook.queue_size)
+        self.workers: List[asyncio.Task] = []
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if webhook.secret and request.headers.get(SECRET_HEADER) != webhook.secret:
+            return web.Response(status=401)
+
+        data = await request.json()
+        update_id = data.get('update_id')
+        if update_id is not None and not await mark_seen(update_id):
+            self.duplicates += 1
+            return web.Response()
+
+        try:
+            if self.sink:
+                await self.sink(data)
+            else:
+                self.queue.put_nowait(data)
+        except Exception as e:
+            self.rejected += 1
+            if not isinstance(e, asyncio.QueueFull):
+                logger.error(f"Апдейт {update_id} не принят: {e}")
+            if update_id is not None:
+                await unmark_seen(update_id)
+            return web.Response(status=503)
+
+        self.accepted += 1
+        return web.Response()
+
+    async def _worker(self):
+        Bot.set_current(self.dp.bot)
+        Dispatcher.set_current(self.dp)
+        while True:
+            data = await self.queue.get()
+            try:
+                await self.dp.process_updates([types.Update(**data)])
+            except Exception as e:
+                logger.exception(f"Ошибка обработки апдейта: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _startup(self, app: web.Application):
+        if self.on_startup:
+            await self.on_startup(self.dp)
+        if not self.sink:
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(webhook.workers)]
+        await self.dp.bot.set_webhook(webhook.url, secret_token=webhook.secret)
+        logger.info(f"Webhook установлен: {webhook.url}")
+
+    async def _shutdown(self, app: web.Application):
+        # Один дедлайн на всю остановку: что ушло на очередь, того уже нет у on_shutdown
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + webhook.shutdown_timeout
+        # Сначала дорабатываем уже принятые апдейты
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=webhook.shutdown_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не дождались обработки {self.queue.qsize()} апдейтов")
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        if self.on_shutdown:
+            await self.on_shutdown(self.dp, deadline)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(webhook.path, self.handle)
+        app.on_startup.append(self._startup)
+        app.on_shutdown.append(self._shutdown)
+        return app
+
+    def run(self):
+        web.run_app(self.app(), host=webhook.app_host, port=webhook.app_port)
+
+
+def start_webhook(dp: Dispatcher, on_startup=None, on_shutdown=None):
+    WebhookServer(dp, on_startup=on_startup, on_shutdown=on_shutdown).run()
@@ -1,26 +1,50 @@
+import asyncio
+import hashlib
+import json
+from typing import Optional
+
 from loguru import logger
-from aiogram import executor
 
 from bot.configs.db_pool import create_pool
 from bot.configs.databases import postgresql, r
+from bot.databases import redis as redis_db
 from bot.databases.init import init_db
-from bot.handlers.all import register_all_handlers
+from bot.databases.admins import AdminCache
+from bot.databases.activity import ActivityTracker
+from bot.handlers.all import register_all_handlers, register_all_middlewares
+from bot.functions.admin import Broadcast
+from bot.functions.media import Media
+from bot.keyboards import registry as keyboards
+from bot.other.outbound import Outbound
+from bot.other.sampler import SystemSampler
+from bot.other.startup import StartupReport
+from bot.polling import Poller, start_polling
 from bot.configs.bot import dp, bot
 from bot.configs.commands import botcommands
+from bot.configs.webhook import webhook
+from bot.configs.metrics import metrics_config
+from bot.configs import db_pool
+from bot.middlewares import metrics
 
-async def on_startup(dp):
-    logger.info("Бот запускается...")
-
+async def _start_postgres():
     # 🔁 Создание пула
     await create_pool(
         user=postgresql.user,
         password=postgresql.password,
         database=postgresql.db_name,
         host=postgresql.host,
-        port=postgresql.port
+        port=postgresql.port,
+        min_size=postgresql.pool_min_size,
+        max_size=postgresql.pool_max_size,
+        max_inactive_connection_lifetime=postgresql.pool_max_inactive_lifetime,
+        statement_cache_size=postgresql.statement_cache_size,
+        command_timeout=postgresql.command_timeout,
+        connect_timeout=postgresql.connect_timeout,
+        pool_acquire_timeout=postgresql.pool_acquire_timeout,
+        slow_query_threshold=postgresql.slow_query_threshold
     )
 
-    # 🔁 Создание таблиц
+    # 🔁 Миграции
     try:
         await init_db()
         logger.info("База данных инициализирована.")
@@ -28,16 +52,141 @@ async def on_startup(dp):
         logger.error("Ошибка при инициализации базы данных:")
         raise
 
-    register_all_handlers(dp)
-    logger.info("Хендлеры зарегистрированы.")
+    await AdminCache.start()
+
+    # Реплики для чтения (если заданы) — после миграций, чтобы подготовить запросы по новой схеме
+    await db_pool.start_replicas(
+        postgresql.replica_hosts,
+        default_port=postgresql.port,
+        min_size=postgresql.replica_pool_min_size,
+        max_size=postgresql.replica_pool_max_size,
+        max_lag=postgresql.replica_max_lag,
+        health_interval=postgresql.replica_health_interval
+    )
+
+
+async def _sync_commands():
+    """set_my_commands только если список команд изменился с прошлого запуска."""
+    payload = json.dumps([c.to_python() for c in botcommands], ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    key = f"bot:{bot.id}:commands_hash"
+    try:
+        if await r.get(key) == digest:
+            logger.info("Команды не изменились — пропускаем set_my_commands.")
+            return
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать хэш команд: {e!r}")
 
     await bot.set_my_commands(botcommands)
     logger.info("Команды зарегистрированы.")
-    
-async def on_shutdown(dp):
+    try:
+        await r.set(key, digest)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить хэш команд: {e!r}")
+
+
+async def on_startup(dp):
+    logger.info("Бот запускается...")
+    StartupReport.begin()
+
+    async with StartupReport.phase("handlers"):
+        register_all_handlers(dp)
+        register_all_middlewares(dp)
+        logger.info("Хендлеры зарегистрированы.")
+
+    # Независимые шаги — параллельно: БД, команды Telegram, сервер метрик
+    await asyncio.gather(
+        StartupReport.timed("postgres", _start_postgres()),
+        StartupReport.timed("commands", _sync_commands()),
+        StartupReport.timed("metrics", metrics.start_server(
+            metrics_config.host,
+            metrics_config.port,
+            db_pool.metrics.render_prometheus,
+            lambda: metrics.render_stats("bot_outbound", Outbound.stats()),
+            lambda: metrics.render_stats("bot_activity", ActivityTracker.stats()),
+            lambda: metrics.render_stats("bot_media", Media.stats()),
+            lambda: metrics.render_stats("bot_keyboards", keyboards.stats()),
+            lambda: metrics.render_stats("bot_startup", StartupReport.stats()),
+        )),
+    )
+
+    async with StartupReport.phase("background"):
+        ActivityTracker.start()
+        SystemSampler.start()
+        Outbound.start()
+        await Broadcast.resume_all()
+
+    StartupReport.finish()
+
+
+async def _wait_inflight(deadline: float) -> bool:
+    """Дождаться, пока middleware метрик не покажет ноль апдейтов в работе."""
+    loop = asyncio.get_running_loop()
+    while metrics.Metrics.inflight and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+    return not metrics.Metrics.inflight
+
+
+async def on_shutdown(dp, deadline: Optional[float] = None):
+    """
+    deadline — loop.time(), к которому надо уложиться. Webhook передаёт свой: часть
+    SHUTDOWN_TIMEOUT уже ушла на дообработку очереди, второй полный таймаут не положен.
+    """
     logger.info("🛑 Бот останавливается...")
-    if r:
-        r.close()
+    loop = asyncio.get_running_loop()
+    if deadline is None:
+        deadline = loop.time() + webhook.shutdown_timeout
+    abandoned = []
+
+    # 1. Новой работы больше не берём; рассылки продолжатся после рестарта (или на другом инстансе)
+    await Broadcast.stop()
+
+    # 2. Дорабатываем то, что уже получено, но не дольше SHUTDOWN_TIMEOUT.
+    #    В режиме worker партиции к этому моменту уже отпущены — с дообработкой текущих апдейтов
+    unfinished = await Poller.stop(deadline)
+    if unfinished:
+        abandoned.append(f"пачек апдейтов из polling: {unfinished}")
+    if not await _wait_inflight(deadline):
+        abandoned.append(f"апдейтов в обработке: {metrics.Metrics.inflight}")
+    if not await Outbound.drain(max(0.0, deadline - loop.time())):
+        abandoned.append(f"исходящих сообщений: {Outbound.pending()}")
+    await Outbound.stop()
+
+    # 3. Фоновые задачи и отложенные записи
+    await metrics.stop_server()
+    await SystemSampler.stop()
+    await AdminCache.stop()
+    await ActivityTracker.stop()
+    if ActivityTracker.stats()["pending"]:
+        abandoned.append(f"обновлений last_active: {ActivityTracker.stats()['pending']}")
+
+    # 4. Соединения: Postgres, хранилище FSM, Redis, HTTP-сессия бота
+    await db_pool.stop_replicas()
+    if db_pool.pool is not None:
+        try:
+            await asyncio.wait_for(db_pool.pool.close(), timeout=max(1.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            abandoned.append("соединения Postgres (закрыты принудительно)")
+            db_pool.pool.terminate()
+    await dp.storage.close()
+    await dp.storage.wait_closed()
+    await redis_db.close()
+    await (await bot.get_session()).close()
+
+    if abandoned:
+        logger.warning(f"Остановлено с потерями — брошено {'; '.join(abandoned)}")
+    else:
+        logger.info("Бот остановлен, вся работа доделана.")
 
 if __name__ == '__main__':
-    executor.start_polling(dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown)
\ No newline at end of file
+    if webhook.mode == 'webhook':
+        from bot.webhook import start_webhook
+        start_webhook(dp, on_startup=on_startup, on_shutdown=on_shutdown)
+    elif webhook.mode == 'ingress':
+        from bot.sharding import start_ingress
+        start_ingress(dp)
+    elif webhook.mode == 'worker':
+        from bot.sharding import start_worker
+        start_worker(dp, on_startup=on_startup, on_shutdown=on_shutdown)
+    else:
+        start_polling(dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown)
\ No newline at end of file
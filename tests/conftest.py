@@ -0,0 +1,4 @@
+import os
+
+# Конфиги читаются при импорте: бот без токена не создаётся, а сеть тестам не нужна
+os.environ.setdefault("API_TOKEN", "123456:TEST")
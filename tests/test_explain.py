@@ -0,0 +1,58 @@
+"""
+Каждый зарегистрированный запрос должен выполняться по индексу.
+Нужен PostgreSQL из env (POSTGRES_*); без него тесты пропускаются.
+"""
+import asyncio
+
+import asyncpg
+import pytest
+
+from bot.configs import db_pool
+from bot.configs.databases import postgresql
+from bot.databases import explain
+from bot.databases.migrations import migrate
+from bot.databases.postgres import User
+
+
+async def _plans():
+    if not postgresql.host:
+        pytest.skip("PostgreSQL не настроен (POSTGRES_HOST)")
+    try:
+        await db_pool.create_pool(
+            user=postgresql.user,
+            password=postgresql.password,
+            database=postgresql.db_name,
+            host=postgresql.host,
+            port=postgresql.port or 5432,
+            min_size=1,
+            max_size=1,
+            connect_timeout=5
+        )
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+        pytest.skip(f"PostgreSQL недоступен: {e!r}")
+    try:
+        await migrate()
+        async with db_pool.pool.acquire() as conn:
+            return {name: await explain.explain(conn, query) for name, query in db_pool.statements.items()}
+    finally:
+        await db_pool.pool.close()
+
+
+@pytest.fixture(scope="module")
+def plans():
+    return asyncio.run(_plans())
+
+
+def test_no_seq_scans(plans):
+    failed = {
+        name: tables for name, tables in (
+            (name, [table for node, table in explain.scans(plan) if node == "Seq Scan"])
+            for name, plan in plans.items()
+        ) if tables
+    }
+    assert not failed
+
+
+def test_broadcast_page_uses_index(plans):
+    nodes = explain.scans(plans[User.BROADCAST_PAGE])
+    assert nodes and all(node.endswith("Index Scan") or node == "Index Only Scan" for node, _ in nodes)
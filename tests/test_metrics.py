@@ -0,0 +1,39 @@
+import pytest
+
+from bot.middlewares.metrics import Histogram
+
+
+def test_small_values_are_exact():
+    for v in range(1 << Histogram.SUB_BITS):
+        assert Histogram._value(Histogram._index(v)) == v
+
+
+def test_bucket_index_is_monotonic():
+    indices = [Histogram._index(v) for v in range(1, 1 << 20, 7)]
+    assert indices == sorted(indices)
+
+
+@pytest.mark.parametrize("v", [64, 65, 100, 1000, 12345, 10 ** 6, 3 * 10 ** 9])
+def test_relative_error_is_about_three_percent(v):
+    assert Histogram._value(Histogram._index(v)) == pytest.approx(v, rel=0.032)
+
+
+def test_huge_values_land_in_last_bucket():
+    assert Histogram._index(1 << 60) == Histogram.SIZE - 1
+
+
+def test_percentiles_and_totals():
+    h = Histogram()
+    for ms in range(1, 101):
+        h.record(ms / 1000)
+    assert h.count == 100
+    assert h.total == pytest.approx(5.05)
+    assert h.max == pytest.approx(0.1)
+    assert h.percentile(50) == pytest.approx(0.05, rel=0.03)
+    assert h.percentile(99) == pytest.approx(0.099, rel=0.03)
+    # Перцентиль не превышает реальный максимум, даже если середина корзины выше
+    assert h.percentile(100) <= h.max
+
+
+def test_empty_histogram():
+    assert Histogram().percentile(99) == 0.0
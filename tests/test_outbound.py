@@ -0,0 +1,54 @@
+import pytest
+
+from bot.other.outbound import TokenBucket
+
+
+def test_bucket_allows_burst_up_to_capacity():
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.reserve(100.0) == 0.0
+    assert bucket.reserve(100.0) == 0.0
+    # Дальше — в долг: каждое следующее резервирование ждёт ещё 1/rate
+    assert bucket.reserve(100.0) == pytest.approx(0.5)
+    assert bucket.reserve(100.0) == pytest.approx(1.0)
+
+
+def test_bucket_refills_over_time_but_not_above_capacity():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.reserve(100.0) == 0.0
+    assert bucket.reserve(100.0) == pytest.approx(1.0)
+    # Через 2 с долг погашен и накопился ровно один токен
+    assert bucket.reserve(102.0) == 0.0
+    assert bucket.reserve(102.0) == pytest.approx(1.0)
+    assert not bucket.is_idle(102.5)
+    assert bucket.is_idle(1000.0)
+    assert bucket.tokens == 1
+
+
+def test_pause_delays_next_reservation():
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.pause(100.0, 5)
+    assert bucket.reserve(100.0) == pytest.approx(6.0)
+
+
+def test_pause_counts_down_with_time():
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.pause(100.0, 5)
+    assert bucket.reserve(103.0) == pytest.approx(3.0)
+
+
+@pytest.mark.parametrize("pauses", [(5, 3), (3, 5), (5, 5)])
+def test_pauses_do_not_stack(pauses):
+    bucket = TokenBucket(rate=1, capacity=1)
+    for seconds in pauses:
+        bucket.pause(100.0, seconds)
+    # Пауза — самая длинная из запрошенных, а не их сумма
+    assert bucket.reserve(100.0) == pytest.approx(6.0)
+
+
+def test_pause_keeps_existing_debt():
+    bucket = TokenBucket(rate=1, capacity=1)
+    for _ in range(10):
+        bucket.reserve(100.0)
+    # Долг 9 с больше паузы 2 с — пауза его не уменьшает
+    bucket.pause(100.0, 2)
+    assert bucket.reserve(100.0) == pytest.approx(10.0)
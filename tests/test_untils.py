@@ -0,0 +1,123 @@
+import re
+
+import pytest
+
+from bot import untils
+from bot.untils import TTLCache, _chunk, _utf16_len
+
+
+def _strip_tags(text: str) -> str:
+    return re.sub(r"<[^<>]*>", "", text)
+
+
+def test_chunk_short_text_is_one_part():
+    assert _chunk("hello <b>world</b>") == ["hello <b>world</b>"]
+
+
+def test_chunk_splits_on_newlines_and_keeps_text():
+    lines = [f"line {i}" for i in range(50)]
+    text = "\n".join(lines)
+    parts = _chunk(text, limit=40)
+    assert len(parts) > 1
+    assert all(_utf16_len(p) <= 40 for p in parts)
+    assert "".join(parts) == text
+    # Режем после перевода строки, а не посреди строки
+    assert all(p.endswith("\n") for p in parts[:-1])
+
+
+def test_chunk_counts_utf16_units():
+    # Эмодзи вне BMP — две единицы UTF-16, пару суррогатов не разрываем
+    parts = _chunk("😀" * 10, limit=5)
+    assert parts == ["😀😀"] * 5
+
+
+def test_chunk_hard_cuts_long_words():
+    parts = _chunk("x" * 25, limit=10)
+    assert parts == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_chunk_reopens_tags_across_parts():
+    text = "<b>" + "word " * 50 + "</b>"
+    parts = _chunk(text, limit=40)
+    assert len(parts) > 1
+    for part in parts:
+        assert _utf16_len(part) <= 40
+        assert part.startswith("<b>") and part.endswith("</b>")
+        assert part.count("<b>") == part.count("</b>") == 1
+    assert "".join(_strip_tags(p) for p in parts) == _strip_tags(text)
+
+
+def test_chunk_keeps_nested_tags_balanced():
+    text = '<a href="https://example.com"><i>' + "ab " * 40 + "</i></a> tail"
+    for part in _chunk(text, limit=60):
+        assert _utf16_len(part) <= 60
+        assert part.count("<i>") == part.count("</i>")
+        assert part.count("<a ") == part.count("</a>")
+
+
+def test_chunk_does_not_break_entities():
+    parts = _chunk("&amp;" * 20, limit=12)
+    assert all(_utf16_len(p) <= 12 for p in parts)
+    assert all(re.fullmatch(r"(&amp;)+", p) for p in parts)
+    assert "".join(parts) == "&amp;" * 20
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(untils, "time", clock)
+    return clock
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+    clock.now += 4.9
+    assert cache.get("a") == 1
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert len(cache) == 0
+
+
+def test_ttl_cache_set_refreshes_expiry(clock):
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+    clock.now += 4
+    cache.set("a", 2)
+    clock.now += 4
+    assert cache.get("a") == 2
+
+
+def test_ttl_cache_without_ttl_never_expires(clock):
+    cache = TTLCache(maxsize=10, ttl=None)
+    cache.set("a", 1)
+    clock.now += 10 ** 9
+    assert cache.get("a") == 1
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" теперь свежее "b"
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl_cache_stores_falsy_values(clock):
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("zero", 0)
+    assert "zero" in cache
+    assert cache.get("zero", "default") == 0
+    assert cache.pop("zero") == 0
+    assert cache.pop("zero", "gone") == "gone"